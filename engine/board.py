@@ -0,0 +1,93 @@
+from typing import Dict, Tuple, Union
+
+from engine.constants import GRID_SIZE
+
+
+def tile_mask(x: int, y: int) -> int:
+    """ This function returns the bit of a tile in a board mask. """
+    return 1 << (y * GRID_SIZE + x)
+
+
+class Board:
+    """
+      This class represents the board of a player as bitboards.
+
+      Every ship is an integer mask with a bit set for each tile it takes
+      up, tiles are numbered row by row. Shots and hits are masks too, so
+      checking a shot, a sunk ship or a sunk fleet is a few integer
+      operations and a board is a handful of integers.
+    """
+
+    __slots__ = ('ship_masks', 'fleet_mask', 'shots', 'hits')
+
+    def __init__(self, ship_masks: Dict[str, int]) -> None:
+        self.ship_masks = ship_masks
+        self.fleet_mask = 0
+        for ship_mask in ship_masks.values():
+            self.fleet_mask |= ship_mask
+
+        self.shots = 0
+        self.hits = 0
+
+    def shoot(self, x: int, y: int) -> Tuple[Union[str, None], bool]:
+        """
+          This function shoots a tile and returns the ship hit, if any,
+          and if that ship sank. Tiles outside the board or already shot
+          hit nothing, and coordinates that are not integers are not a
+          tile, so they are not shot.
+        """
+
+        if type(x) != int or type(y) != int:
+            return None, False
+
+        if not (0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE):
+            return None, False
+
+        tile = tile_mask(x, y)
+        if self.shots & tile:
+            return None, False
+
+        self.shots |= tile
+        if not self.fleet_mask & tile:
+            return None, False
+
+        self.hits |= tile
+        for ship_name, ship_mask in self.ship_masks.items():
+            if ship_mask & tile:
+                return ship_name, self.is_sunk(ship_name)
+
+        return None, False
+
+    def get_snapshot(self) -> dict:
+        """ This function returns board masks as a JSON serializable dict. """
+        return {
+            'ship_masks': dict(self.ship_masks),
+            'shots': self.shots,
+            'hits': self.hits
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict) -> 'Board':
+        """ This function creates a board from a snapshot. """
+
+        board = cls(snapshot['ship_masks'])
+        board.shots = snapshot['shots']
+        board.hits = snapshot['hits']
+
+        return board
+
+    def was_shot(self, x: int, y: int) -> bool:
+        """ This function checks if a tile was already shot. """
+        return bool(self.shots & tile_mask(x, y))
+
+    def is_sunk(self, ship_name: str) -> bool:
+        """ This function checks if every tile of a ship was hit. """
+        return not self.ship_masks[ship_name] & ~self.hits
+
+    def all_sunk(self) -> bool:
+        """ This function checks if every ship of the board sank. """
+        return not self.fleet_mask & ~self.hits
+
+    def count_sunk(self) -> int:
+        """ This function returns how many ships sank. """
+        return sum(self.is_sunk(ship_name) for ship_name in self.ship_masks)
@@ -0,0 +1,6 @@
+PLAYERS_PER_MATCH = 2
+SHIPS_NAMES = ['B', 'C', 'D', 'R', 'S']
+
+# Game grid is GRID_SIZE x GRID_SIZE tiles, ships take up a line of tiles
+GRID_SIZE = 20
+SHIPS_SIZES = {'B': 11, 'C': 7, 'D': 5, 'R': 5, 'S': 7}
@@ -0,0 +1,87 @@
+import random
+from typing import Dict, List
+
+from engine.board import tile_mask
+from engine.constants import GRID_SIZE, SHIPS_NAMES, SHIPS_SIZES
+
+
+def place_fleet(fleet: List[list]) -> Dict[str, int]:
+    """
+      This function validates a fleet and returns the board mask of
+      every ship.
+
+      A fleet is a list of placements [ship_name, x, y, is_vertical],
+      where (x, y) is the first tile of the ship. Every ship has to be
+      placed once, inside the grid and without overlapping other ships,
+      otherwise ValueError is raised.
+    """
+
+    if len(fleet) != len(SHIPS_NAMES):
+        raise ValueError(f'Fleet must have {len(SHIPS_NAMES)} ships')
+
+    ship_masks = {}
+    fleet_mask = 0
+
+    for ship_name, x, y, is_vertical in fleet:
+        if ship_name not in SHIPS_SIZES or ship_name in ship_masks:
+            raise ValueError(f'Unknown or repeated ship: {ship_name}')
+        if type(x) != int or type(y) != int:
+            raise ValueError(f'Invalid position of ship: {ship_name}')
+
+        ship_size = SHIPS_SIZES[ship_name]
+        end_x, end_y = (x, y + ship_size - 1) if is_vertical else (x + ship_size - 1, y)
+        if not (0 <= x and 0 <= y and end_x < GRID_SIZE and end_y < GRID_SIZE):
+            raise ValueError(f'Ship out of grid: {ship_name}')
+
+        ship_mask = 0
+        for i in range(ship_size):
+            ship_mask |= tile_mask(x, y + i) if is_vertical else tile_mask(x + i, y)
+
+        if ship_mask & fleet_mask:
+            raise ValueError(f'Ship overlaps another ship: {ship_name}')
+
+        ship_masks[ship_name] = ship_mask
+        fleet_mask |= ship_mask
+
+    return ship_masks
+
+
+def random_fleet(rng: random.Random = random) -> List[list]:
+    """ This function returns a valid fleet of randomly placed ships. """
+
+    while True:
+        fleet = []
+        for ship_name in SHIPS_NAMES:
+            is_vertical = rng.random() < 0.5
+            ship_size = SHIPS_SIZES[ship_name]
+            x = rng.randrange(GRID_SIZE - (0 if is_vertical else ship_size - 1))
+            y = rng.randrange(GRID_SIZE - (ship_size - 1 if is_vertical else 0))
+            fleet.append([ship_name, x, y, is_vertical])
+
+        try:
+            place_fleet(fleet)
+        except ValueError:
+            continue
+
+        return fleet
+
+
+def edge_fleet(rng: random.Random = random) -> List[list]:
+    """ This function returns a valid fleet of ships randomly placed along grid edges. """
+
+    while True:
+        fleet = []
+        for ship_name in SHIPS_NAMES:
+            is_vertical = rng.random() < 0.5
+            edge = rng.choice((0, GRID_SIZE - 1))
+            position = rng.randrange(GRID_SIZE - SHIPS_SIZES[ship_name] + 1)
+            fleet.append(
+                [ship_name, edge, position, True] if is_vertical
+                else [ship_name, position, edge, False])
+
+        try:
+            place_fleet(fleet)
+        except ValueError:
+            continue
+
+        return fleet
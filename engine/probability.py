@@ -0,0 +1,145 @@
+import random
+from typing import Dict, Tuple, Union
+
+import numpy as np
+
+from engine.constants import GRID_SIZE, SHIPS_NAMES, SHIPS_SIZES
+
+
+def window_sums(mask: np.ndarray, length: int) -> np.ndarray:
+    """
+      This function returns, for every row, how many tiles of a mask
+      fall in each horizontal window of a length.
+    """
+
+    sums = np.zeros((mask.shape[0], mask.shape[1] + 1), dtype=np.int32)
+    np.cumsum(mask, axis=1, out=sums[:, 1:])
+    return sums[:, length:] - sums[:, :-length]
+
+
+def spread_windows(windows: np.ndarray, length: int) -> np.ndarray:
+    """
+      This function returns, for every tile, how many windows of a
+      length marked in a window array cover it.
+    """
+
+    window_count = windows.shape[1]
+    sums = np.zeros((windows.shape[0], window_count + 1), dtype=np.int32)
+    np.cumsum(windows, axis=1, out=sums[:, 1:])
+
+    tiles = np.arange(GRID_SIZE)
+    last_window = np.minimum(tiles, window_count - 1) + 1
+    first_window = np.maximum(tiles - length + 1, 0)
+    return sums[:, last_window] - sums[:, first_window]
+
+
+class ProbabilityStrategy:
+    """
+      This class picks the tiles a bot attacks by probability density.
+
+      For every ship afloat, every placement that is consistent with the
+      shots made so far is counted: placements of a ship already hit
+      must cover all of its hits, and no placement covers other shot
+      tiles. Placements are counted for whole rows at once with NumPy
+      sliding window sums, so a move takes well under a millisecond.
+
+      Heatmap is the expected number of ships on every tile, the tile
+      most likely to hold a ship is attacked next.
+    """
+
+    def __init__(self, rng: random.Random = random) -> None:
+        self.rng = rng
+        self.reset()
+
+    def reset(self) -> None:
+        """ This function forgets the shots of previous game. """
+
+        # Masks are indexed by [y, x] like the rows of the grid
+        self.shot_tiles = np.zeros((GRID_SIZE, GRID_SIZE), dtype=bool)
+        self.sunk_ships = set()
+
+        # Tiles hit of every ship that is still afloat
+        self.ship_hits = {}
+
+    def next_shot(self) -> Tuple[int, int]:
+        """ This function returns the next tile to attack. """
+
+        heatmap = self.get_heatmap()
+        if not heatmap.any():
+            heatmap = (~self.shot_tiles).astype(np.float64)
+
+        best_tiles = np.flatnonzero(heatmap == heatmap.max())
+        y, x = divmod(int(best_tiles[self.rng.randrange(len(best_tiles))]), GRID_SIZE)
+
+        return x, y
+
+    def record_shot(self, position: Tuple[int, int], ship_name: str, sunk: bool) -> None:
+        """ This function learns from the response to an attack. """
+
+        x, y = position
+        self.shot_tiles[y, x] = True
+        if ship_name is None:
+            return
+
+        if sunk:
+            self.ship_hits.pop(ship_name, None)
+            self.sunk_ships.add(ship_name)
+        else:
+            self.ship_hits.setdefault(
+                ship_name, np.zeros((GRID_SIZE, GRID_SIZE), dtype=bool))[y, x] = True
+
+    def get_heatmap(self) -> np.ndarray:
+        """ This function returns the expected number of ships on every tile not shot yet. """
+
+        heatmap = np.zeros((GRID_SIZE, GRID_SIZE))
+
+        # Ships not hit yet only depend on their size
+        densities: Dict[int, np.ndarray] = {}
+        for ship_name in SHIPS_NAMES:
+            if ship_name in self.sunk_ships:
+                continue
+
+            ship_size = SHIPS_SIZES[ship_name]
+            hits = self.ship_hits.get(ship_name)
+            if hits is not None:
+                heatmap += self.__ship_density(self.shot_tiles & ~hits, hits, ship_size)
+            else:
+                if ship_size not in densities:
+                    densities[ship_size] = self.__ship_density(self.shot_tiles, None, ship_size)
+                heatmap += densities[ship_size]
+
+        heatmap[self.shot_tiles] = 0
+        return heatmap
+
+    def __ship_density(
+            self,
+            blocked: np.ndarray,
+            hits: Union[np.ndarray, None],
+            ship_size: int) -> np.ndarray:
+        """
+          This function returns the chance of every tile to hold a ship,
+          counting its horizontal and vertical placements.
+        """
+
+        coverage = self.__row_coverage(blocked, hits, ship_size)
+        coverage += self.__row_coverage(
+            blocked.T, None if hits is None else hits.T, ship_size).T
+
+        placements = coverage.sum() / ship_size
+        return coverage / placements if placements else coverage.astype(np.float64)
+
+    def __row_coverage(
+            self,
+            blocked: np.ndarray,
+            hits: Union[np.ndarray, None],
+            ship_size: int) -> np.ndarray:
+        """
+          This function returns, for every tile, how many horizontal
+          placements of a ship cover it.
+        """
+
+        placements = window_sums(blocked, ship_size) == 0
+        if hits is not None:
+            placements &= window_sums(hits, ship_size) == hits.sum()
+
+        return spread_windows(placements, ship_size)
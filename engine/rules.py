@@ -0,0 +1,39 @@
+from typing import Dict, Iterable, Tuple, Union
+
+from engine.board import Board
+
+
+def get_enemy(player_names: Iterable[str], player_name: str) -> Union[str, None]:
+    """ This function returns the other player of a game, if any. """
+    return next((enemy_name for enemy_name in player_names if enemy_name != player_name), None)
+
+
+def is_valid_shot(position: object) -> bool:
+    """
+      This function checks if a shot is a pair of integer coordinates.
+      Shots outside the board are valid, they hit nothing.
+    """
+    return (
+        isinstance(position, (list, tuple))
+        and len(position) == 2
+        and all(type(value) == int for value in position)
+    )
+
+
+def pass_turn(player_names: Iterable[str], attacker_name: str) -> Dict[str, bool]:
+    """
+      This function returns if it is the turn of every player after an
+      attack. Every attack gives turn to the enemy, hit or not.
+    """
+    return {player_name: player_name != attacker_name for player_name in player_names}
+
+
+def resolve_attack(enemy_board: Board, x: int, y: int) -> Tuple[Union[str, None], bool, bool]:
+    """
+      This function shoots a tile of the enemy board. It returns the
+      ship hit, if any, if that ship sank and if the whole fleet sank,
+      which ends the game with the attacker as winner.
+    """
+
+    ship_name, sunk = enemy_board.shoot(x, y)
+    return ship_name, sunk, sunk and enemy_board.all_sunk()
@@ -0,0 +1,170 @@
+import os
+import time
+import random
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+from engine.board import Board
+from engine.rules import resolve_attack
+from engine.fleet import place_fleet, random_fleet, edge_fleet
+from engine.strategies import STRATEGIES
+
+
+FLEETS: Dict[str, Callable[[random.Random], List[list]]] = {
+    'random': random_fleet,
+    'edges': edge_fleet
+}
+
+# Games are split in chunks, every worker plays a chunk and only sends
+# back its aggregated stats
+SIMULATION_CHUNK_SIZE = 500
+
+
+def play_game(
+        strategy_names: Tuple[str, str],
+        fleet_names: Tuple[str, str],
+        first_player: int,
+        rng: random.Random) -> Tuple[int, int]:
+    """
+      This function plays a game between two sides and returns the
+      winner side and its shots. Attacks follow engine rules, like in
+      a Match: every attack gives turn to the enemy, and a game is over
+      once a fleet sinks.
+    """
+
+    boards = [Board(place_fleet(FLEETS[fleet_name](rng))) for fleet_name in fleet_names]
+    strategies = [STRATEGIES[strategy_name](rng) for strategy_name in strategy_names]
+    shots = [0, 0]
+
+    attacker = first_player
+    while True:
+        enemy = 1 - attacker
+        position = strategies[attacker].next_shot()
+        ship_name, sunk, fleet_sunk = resolve_attack(boards[enemy], *position)
+        strategies[attacker].record_shot(position, ship_name, sunk)
+        shots[attacker] += 1
+
+        if fleet_sunk:
+            return attacker, shots[attacker]
+
+        attacker = enemy
+
+
+def simulate_chunk(
+        strategy_names: Tuple[str, str],
+        fleet_names: Tuple[str, str],
+        seed: int,
+        first_game: int,
+        games: int) -> List[Counter]:
+    """
+      This function plays a chunk of games and returns, for every side,
+      how many games it won with each number of shots. Every game is
+      seeded by its number, so results do not depend on how games are
+      split between workers. Sides take turns to start.
+    """
+
+    shots_to_win = [Counter(), Counter()]
+    for game in range(first_game, first_game + games):
+        rng = random.Random(f'{seed}-{game}')
+        winner, shots = play_game(strategy_names, fleet_names, game % 2, rng)
+        shots_to_win[winner][shots] += 1
+
+    return shots_to_win
+
+
+def run_simulation(
+        games: int,
+        strategy_names: Tuple[str, str] = ('hunt_target', 'hunt_target'),
+        fleet_names: Tuple[str, str] = ('random', 'random'),
+        seed: int = 0,
+        workers: int = None,
+        chunk_size: int = SIMULATION_CHUNK_SIZE) -> dict:
+    """
+      This function plays games between two sides on a pool of worker
+      processes and returns stats of every side and throughput.
+    """
+
+    started_at = time.perf_counter()
+    shots_to_win = [Counter(), Counter()]
+
+    with ProcessPoolExecutor(workers or os.cpu_count()) as executor:
+        chunks = [
+            executor.submit(
+                simulate_chunk, strategy_names, fleet_names, seed,
+                first_game, min(chunk_size, games - first_game))
+            for first_game in range(0, games, chunk_size)
+        ]
+        for chunk in chunks:
+            for side, chunk_shots in enumerate(chunk.result()):
+                shots_to_win[side].update(chunk_shots)
+
+    elapsed = time.perf_counter() - started_at
+    sides = []
+    for side, side_shots in enumerate(shots_to_win):
+        wins = sum(side_shots.values())
+        sides.append({
+            'strategy': strategy_names[side],
+            'fleet': fleet_names[side],
+            'wins': wins,
+            'win_rate': wins / games if games else 0,
+            'mean_shots_to_win': (
+                sum(shots * count for shots, count in side_shots.items()) / wins if wins else 0),
+            'shots_to_win': dict(sorted(side_shots.items()))
+        })
+
+    return {
+        'games': games,
+        'elapsed': elapsed,
+        'games_per_second': games / elapsed if elapsed else 0,
+        'sides': sides
+    }
+
+
+def get_percentile(shots_to_win: Dict[int, int], percentile: float) -> int:
+    """ This function returns a percentile of a shots to win distribution. """
+
+    threshold = sum(shots_to_win.values()) * percentile / 100
+    count = 0
+    for shots, shots_count in shots_to_win.items():
+        count += shots_count
+        if count >= threshold:
+            return shots
+
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Play games between two strategies and report their stats.')
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--first', choices=sorted(STRATEGIES), default='hunt_target',
+                        help='strategy of first side')
+    parser.add_argument('--second', choices=sorted(STRATEGIES), default='probability',
+                        help='strategy of second side')
+    parser.add_argument('--first-fleet', choices=sorted(FLEETS), default='random')
+    parser.add_argument('--second-fleet', choices=sorted(FLEETS), default='random')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help='processes, CPU count by default')
+    parser.add_argument('--chunk-size', type=int, default=SIMULATION_CHUNK_SIZE)
+    arguments = parser.parse_args()
+
+    stats = run_simulation(
+        arguments.games,
+        (arguments.first, arguments.second),
+        (arguments.first_fleet, arguments.second_fleet),
+        arguments.seed,
+        arguments.workers,
+        arguments.chunk_size)
+
+    print(
+        f'{stats["games"]} games in {stats["elapsed"]:.2f}s '
+        f'({stats["games_per_second"]:.0f} games/s)')
+    for side in stats['sides']:
+        print(
+            f'{side["strategy"]} ({side["fleet"]} fleet): win rate {side["win_rate"]:.2%}, '
+            f'mean shots to win {side["mean_shots_to_win"]:.1f}, shots to win p10/p50/p90 '
+            + '/'.join(
+                str(get_percentile(side['shots_to_win'], percentile))
+                for percentile in (10, 50, 90)))
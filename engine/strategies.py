@@ -0,0 +1,121 @@
+import random
+from typing import List, Tuple
+
+from engine.probability import ProbabilityStrategy
+from engine.constants import GRID_SIZE, SHIPS_NAMES, SHIPS_SIZES
+
+
+class HuntTargetStrategy:
+    """
+      This class picks the tiles a bot attacks.
+
+      While no ship is hit, it hunts: it shoots random tiles of a parity
+      pattern spaced by the size of the smallest ship afloat, so every
+      ship is hit without shooting every tile. Once a ship is hit, it
+      targets it: it shoots along the line of its hits, or around them
+      if the ship was hit once, until it sinks.
+    """
+
+    def __init__(self, rng: random.Random = random) -> None:
+        self.rng = rng
+        self.reset()
+
+    def reset(self) -> None:
+        """ This function forgets the shots of previous game. """
+
+        self.shot_tiles = set()
+        self.sunk_ships = set()
+        self.parity_offset = self.rng.randrange(GRID_SIZE)
+
+        # Tiles hit of every ship that is still afloat
+        self.ship_hits = {}
+
+        # Tiles are hunted in a random order, there is an order with the
+        # tiles of every parity and one with every tile once parities run out
+        free_tiles = [(x, y) for x in range(GRID_SIZE) for y in range(GRID_SIZE)]
+        self.rng.shuffle(free_tiles)
+        self.hunt_orders = {
+            parity: [
+                (x, y) for x, y in free_tiles
+                if (x + y) % parity == self.parity_offset % parity
+            ]
+            for parity in set(SHIPS_SIZES.values())
+        }
+        self.hunt_orders[1] = free_tiles
+
+    def next_shot(self) -> Tuple[int, int]:
+        """ This function returns the next tile to attack. """
+
+        for hits in self.ship_hits.values():
+            target_tiles = self.__target_tiles(hits)
+            if target_tiles:
+                return self.rng.choice(target_tiles)
+
+        return self.__hunt_tile()
+
+    def record_shot(self, position: Tuple[int, int], ship_name: str, sunk: bool) -> None:
+        """ This function learns from the response to an attack. """
+
+        position = tuple(position)
+        self.shot_tiles.add(position)
+        if ship_name is None:
+            return
+
+        if sunk:
+            self.ship_hits.pop(ship_name, None)
+            self.sunk_ships.add(ship_name)
+        else:
+            self.ship_hits.setdefault(ship_name, []).append(position)
+
+    def __hunt_tile(self) -> Tuple[int, int]:
+        """
+          This function returns a random tile of the parity pattern not
+          shot yet. Shot tiles are dropped from the end of hunt orders as
+          they are found, so a game scans every order once.
+        """
+
+        parity = min(
+            SHIPS_SIZES[ship_name]
+            for ship_name in SHIPS_NAMES
+            if ship_name not in self.sunk_ships)
+
+        for hunt_order in (self.hunt_orders[parity], self.hunt_orders[1]):
+            while hunt_order and hunt_order[-1] in self.shot_tiles:
+                hunt_order.pop()
+            if hunt_order:
+                return hunt_order[-1]
+
+        raise ValueError('Every tile was shot')
+
+    def __target_tiles(self, hits: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """ This function returns tiles not shot yet where a hit ship can continue. """
+
+        xs = {x for x, _ in hits}
+        ys = {y for _, y in hits}
+
+        line_tiles = []
+        if len(hits) > 1 and len(xs) == 1:
+            line_tiles = [(hits[0][0], y) for y in range(min(ys) - 1, max(ys) + 2)]
+        elif len(hits) > 1 and len(ys) == 1:
+            line_tiles = [(x, hits[0][1]) for x in range(min(xs) - 1, max(xs) + 2)]
+
+        target_tiles = [tile for tile in line_tiles if self.__can_shoot(tile)]
+        if target_tiles:
+            return target_tiles
+
+        return [
+            (x + dx, y + dy)
+            for x, y in hits
+            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+            if self.__can_shoot((x + dx, y + dy))
+        ]
+
+    def __can_shoot(self, tile: Tuple[int, int]) -> bool:
+        """ This function checks if a tile is inside the grid and not shot yet. """
+        return 0 <= tile[0] < GRID_SIZE and 0 <= tile[1] < GRID_SIZE and tile not in self.shot_tiles
+
+
+STRATEGIES = {
+    'hunt_target': HuntTargetStrategy,
+    'probability': ProbabilityStrategy
+}
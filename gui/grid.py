@@ -1,9 +1,10 @@
-import enum
 import os
 import pygame
-from typing import Tuple
+from typing import List, Tuple
 
-SHIPS_NAMES = ['B', 'C', 'D', 'R', 'S']
+from engine.board import Board
+from engine.fleet import place_fleet
+from engine.constants import GRID_SIZE, SHIPS_SIZES
 
 
 class Grid:
@@ -13,8 +14,9 @@ class Grid:
       and its tile pixel size is 16. It means that every
       tile of map image is 16x16.
 
-      Grid image size is 320x320, so game grid is a 20x20
-      2D array.
+      Grid image size is 320x320, so game grid has GRID_SIZE x
+      GRID_SIZE tiles. Game rules are kept by an engine board, grid
+      only draws it and translates mouse positions into tiles.
     """
 
     def __init__(self, pos_x: float, pos_y: float) -> None:
@@ -24,11 +26,11 @@ class Grid:
             os.path.join('assets', 'map', 'tiled_sea.png'))
 
         self.tile_size = 16
-        self.game_grid_cols = 20
-        self.game_grid_rows = 20
+        self.game_grid_cols = GRID_SIZE
+        self.game_grid_rows = GRID_SIZE
 
-        self.game_grid = [
-            [0 for i in range(self.game_grid_cols)] for j in range(self.game_grid_rows)]
+        # Enemy ships are unknown, so enemy board only tracks attacked tiles
+        self.board = Board({})
 
         self.rect = self.image.get_rect()
         self.rect.x = pos_x
@@ -133,75 +135,43 @@ class Grid:
 
         return position_without_offset
 
-    def locate_ships_into_game_grid(self, ships: list) -> list:
+    def locate_fleet(self, ships: list, fleet: List[list]) -> list:
         """
-          This function locates ships into game grid in order
-          to manage game state.
-
-          The main idea is to use ship.rect.center as a pivot in order to
-          locate the ship on the game grid around this position. The number
-          of tiles used by the ship on the grid is calculated by dividing its
-          collision_rect height or width (depeding on orientation) by tile_size.
-          This value is used together with translated ship.rec.center position
-          to fill the game grid.
+          This function keeps the board of a fleet accepted by server,
+          so attacks received are resolved by the same rules as on
+          server. Ship life is the number of tiles it takes up.
         """
 
-        for index, ship in enumerate(ships):
-            ship_life = 0
-            x, y = self.translate_position(ship.rect.center)
-            
-            if ship.is_vertical:
-                collision_rect_height = ship.collision_rect.height
-                number_of_tiles = int(collision_rect_height // self.tile_size)
-
-                # Locate ship vertically by using translated position as a pivot
-                for i in range(int(number_of_tiles // 2)):
-                    if y - i >= 0:
-                        if self.game_grid[y - i][x] == 0:
-                            ship_life += 1
-                        
-                        self.game_grid[y - i][x] = ship.name
-
-                    if y + i < self.game_grid_rows:
-                        if self.game_grid[y + i][x] == 0:
-                            ship_life += 1
-                        
-                        self.game_grid[y + i][x] = ship.name
-            else:
-                collision_rect_width = ship.collision_rect.width
-                number_of_tiles = int(collision_rect_width // self.tile_size)
-
-                # Locate ship horizontally by using translated position as a pivot
-                for i in range(int(number_of_tiles // 2)):
-                    if x - i >= 0:
-                        if self.game_grid[y][x - i] == 0:
-                            ship_life += 1
-                        
-                        self.game_grid[y][x - i] = ship.name
-
-                    if x + i < self.game_grid_cols:
-                        if self.game_grid[y][x + i] == 0:
-                            ship_life += 1
-                        
-                        self.game_grid[y][x + i] = ship.name
-
-            ships[index].set_ship_life(ship_life)
+        self.board = Board(place_fleet(fleet))
+        for ship in ships:
+            ship.set_ship_life(SHIPS_SIZES[ship.name])
+
         return ships
 
-    def attack_tile(self, position: Tuple[float, float]) -> Tuple[bool, str]:
+    def get_fleet_placements(self, ships: list) -> List[list]:
         """
-          This function evaluates if a ship is located
-          at selected tile in order to attack it.
+          This function returns where ships are located as a list of
+          [ship_name, x, y, is_vertical] placements, where (x, y) is
+          the first tile taken up by the ship.
+
+          Ships are located around ship.rect.center, so a ship of
+          n half tiles starts n - 1 tiles before its pivot.
         """
 
-        # Translate mouse position to grid space
-        x, y = self.translate_position(position)
-        if self.is_valid_position((x, y)):
-            if self.game_grid[y][x] in SHIPS_NAMES:
-                self.game_grid[y][x] = 1
-                return True, self.game_grid[y][x]
+        placements = []
+        for ship in ships:
+            x, y = self.translate_position(ship.rect.center)
+
+            if ship.is_vertical:
+                number_of_tiles = int(ship.collision_rect.height // self.tile_size)
+                y -= int(number_of_tiles // 2) - 1
+            else:
+                number_of_tiles = int(ship.collision_rect.width // self.tile_size)
+                x -= int(number_of_tiles // 2) - 1
+
+            placements.append([ship.name, x, y, ship.is_vertical])
 
-        return False, ''
+        return placements
 
     def is_valid_position(self, position: Tuple[float, float]) -> bool:
         """
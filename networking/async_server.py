@@ -0,0 +1,242 @@
+import asyncio
+import logging
+from typing import Union
+
+from networking.base_server import BaseServer
+from networking.network import ProtocolError, FRAME_HEADER
+from networking.constants import (
+    CONN_LIMIT, HANDSHAKE_TIMEOUT, MAX_FRAME_SIZE, MATCHMAKING_INTERVAL, SEND_BUFFER_LIMIT)
+
+
+logging.basicConfig(format='%(asctime)s - %(message)s',
+                    datefmt='%d-%b-%y %H:%M:%S')
+logging.root.setLevel(logging.NOTSET)
+
+
+class AsyncServer(BaseServer):
+    """
+      This class represents a server instance built on asyncio streams.
+
+      Every client is served by a task of a single event loop instead of
+      a thread, so requests of all clients are processed one at a time
+      and Match state is never touched concurrently.
+
+      Frames are buffered by the transport of every client, clients whose
+      buffer grows over SEND_BUFFER_LIMIT are too slow and disconnected
+      instead of delaying other clients of their match.
+    """
+
+    def __init__(
+            self,
+            host_address: str,
+            host_port: int,
+            event_log_path: Union[str, None] = None,
+            state_path: Union[str, None] = None,
+            metrics_port: Union[int, None] = None) -> None:
+        super().__init__(host_address, host_port, event_log_path, state_path, metrics_port)
+        self.server = None
+        self.matchmaking_task = None
+
+        # Clients served or waiting for their handshake
+        self.open_connections = 0
+
+    async def start_server(self) -> None:
+        """
+          This function recovers persisted matches and starts listening
+          for clients and pairing them.
+        """
+
+        self.start_services()
+
+        self.server = await asyncio.start_server(
+            self.client_listener, self.host_address, self.host_port)
+        self.matchmaking_task = asyncio.create_task(self.matchmaking_lobby())
+
+        logging.info('Server started!')
+
+    async def serve_forever(self) -> None:
+        """ This function starts server and serves clients until it is stopped. """
+
+        await self.start_server()
+        try:
+            await self.server.serve_forever()
+        except asyncio.CancelledError:
+            logging.info('Server stopped.')
+        finally:
+            self.close_services()
+
+    def stop_server(self) -> None:
+        """ This function stops current server. """
+
+        self.matchmaking_task.cancel()
+        self.end_matches()
+        self.server.close()
+        self.close_services()
+
+    async def matchmaking_lobby(self) -> None:
+        """ This function runs matchmaking every interval until server stops. """
+
+        while True:
+            await asyncio.sleep(MATCHMAKING_INTERVAL)
+            self.run_matchmaking()
+
+    async def read_frame(self, reader: asyncio.StreamReader) -> Union[bytes, None]:
+        """
+          This function returns the next frame payload. None is returned
+          if peer closed the connection.
+        """
+
+        try:
+            header = await reader.readexactly(FRAME_HEADER.size)
+            (frame_size,) = FRAME_HEADER.unpack(header)
+            if frame_size > MAX_FRAME_SIZE:
+                raise ProtocolError(f'Frame too large: {frame_size} bytes')
+
+            return await reader.readexactly(frame_size)
+        except asyncio.IncompleteReadError:
+            return None
+
+    async def client_listener(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter) -> None:
+        """
+          This function reads the handshake of a client and serves it.
+          Clients that arrive while every slot is taken are rejected
+          right away, clients waiting for their handshake take a slot
+          too, so they are bounded by CONN_LIMIT and HANDSHAKE_TIMEOUT.
+        """
+
+        client_ip = writer.get_extra_info('peername')
+        if self.open_connections >= CONN_LIMIT:
+            logging.info(f'Server full, rejected client from IP: "{client_ip}"')
+            self.reject_client(writer)
+            return
+
+        self.open_connections += 1
+        try:
+            settings = await self.accept_handshake(reader, writer, client_ip)
+            if settings:
+                await self.serve_client(reader, writer, settings, client_ip)
+        finally:
+            self.open_connections -= 1
+
+    async def accept_handshake(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter,
+            client_ip: object) -> Union[dict, None]:
+        """
+          This function returns the connection settings of an accepted
+          handshake. Rejected clients are told why, and clients whose
+          handshake is late or broken are closed.
+        """
+
+        try:
+            data = await asyncio.wait_for(self.read_frame(reader), HANDSHAKE_TIMEOUT)
+            if data is None:
+                writer.close()
+                return None
+
+            settings, reject_reason = self.read_handshake(data, client_ip)
+        except Exception as error:
+            logging.info(f'No valid handshake from IP: "{client_ip}": {error!r}')
+            writer.close()
+            return None
+
+        if reject_reason:
+            self.reject_client(writer, reject_reason)
+            return None
+
+        return settings
+
+    async def serve_client(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter,
+            settings: dict,
+            client_ip: object) -> None:
+        """
+          This function processes requests of a client until it leaves.
+          Its connection, match and transport are released however it
+          leaves, frames that can not be decoded or handled close it.
+        """
+
+        client_name = settings['client_name']
+        connection = None
+        try:
+            connection = self.open_connection(settings, client_ip, {'writer': writer})
+
+            while True:
+                data = await self.read_frame(reader)
+                if data is None:
+                    break
+
+                if not self.handle_frame(connection, data, client_ip):
+                    break
+
+                # Wait for slow clients instead of buffering without bound
+                await writer.drain()
+        except ConnectionError as error:
+            logging.info(f'Connection lost with client "{client_name}": {error!r}')
+        except Exception as error:
+            logging.info(f'Protocol error from client "{client_name}": {error!r}')
+        finally:
+            writer.close()
+
+            # A connection that could not be opened released what it took
+            if connection is not None:
+                self.remove_connection(connection)
+
+            # Match of a connection closed by server is already ended, peers
+            # that leave or drop their connection end it here
+            if connection is not None and not (
+                connection['closed_by_server'] or connection['spectator']
+            ):
+                logging.info(f'Closing match {connection["match"].match_id}')
+                self.end_game(connection['match'])
+
+    def reject_client(self, writer: asyncio.StreamWriter, reason: str = 'server_full') -> None:
+        """ This function tells a client why it is rejected and closes its connection. """
+
+        writer.write(self.create_datagram({'message': reason}))
+        writer.close()
+
+    def write_message(self, connection: dict, message: bytes) -> None:
+        """
+          This function buffers a frame to be sent to a client, clients
+          whose buffer is over SEND_BUFFER_LIMIT get disconnected.
+        """
+
+        writer = connection['writer']
+        if writer.is_closing():
+            return
+
+        if writer.transport.get_write_buffer_size() > SEND_BUFFER_LIMIT:
+            logging.info(f'Client too slow, disconnecting: {connection["client_name"]}')
+            writer.close()
+            return
+
+        writer.write(message)
+        self.metrics.record_bytes_sent(len(message))
+
+    def close_client(self, connection: dict) -> None:
+        """ This function closes the connection of a client whose match is ended by server. """
+
+        connection['closed_by_server'] = True
+        connection['writer'].close()
+
+
+def run_server(
+        host_address: str,
+        host_port: int,
+        event_log_path: Union[str, None] = None,
+        state_path: Union[str, None] = None,
+        metrics_port: Union[int, None] = None) -> None:
+    """ This function runs an AsyncServer until process is interrupted. """
+    asyncio.run(AsyncServer(
+        host_address, host_port, event_log_path, state_path, metrics_port).serve_forever())
+
+
+if __name__ == '__main__':
+    run_server('localhost', 65432)
@@ -0,0 +1,613 @@
+import math
+import time
+import logging
+from functools import partial
+from threading import RLock
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Tuple, Union
+
+from networking.match import Match
+from networking.event_log import EventLogWriter
+from networking.state_store import StateStore
+from networking.metrics import MetricsRegistry, MetricsEndpoint, is_loopback
+from networking.log_pipeline import RequestLogger, configure_logging
+from networking.matchmaking import Matchmaker
+from networking.network import (
+    Network, FRAME_HEADER, DEFAULT_CODEC, EVENT_REQUEST_ID, negotiate_codec)
+from networking.decorator import thread_safe
+from networking.constants import RATING_BAND_WIDTH, REQUEST_TYPES, RESUME_TIMEOUT
+
+
+class MatchRegistry:
+    """
+      This class keeps every match running on a server.
+
+      Every client starts alone in the lobby of its own match, when
+      matchmaking pairs two clients one of them is moved to the match
+      of the other. A match is removed as soon as it ends or its last
+      client leaves.
+    """
+
+    def __init__(self, create_match: Callable[[int], Match]) -> None:
+        self.create_match = create_match
+        self.lock = RLock()
+        self.next_match_id = 1
+        self.matches = {}
+
+    @thread_safe
+    def open_match(self, client_name: str) -> Match:
+        """ This function creates a match whose lobby holds only this client. """
+
+        match = self.create_match(self.next_match_id)
+        self.matches[match.match_id] = match
+        self.next_match_id += 1
+
+        match.add_client(client_name)
+        return match
+
+    @thread_safe
+    def move_client(self, client_name: str, source: Match, target: Match) -> None:
+        """ This function moves a client, and its subscription, to another match. """
+
+        with source.lock, target.lock:
+            subscribed = client_name in source.game_data['subscribers']
+            self.leave_match(source, client_name)
+            target.add_client(client_name, subscribed)
+
+    @thread_safe
+    def leave_match(self, match: Match, client_name: str) -> None:
+        """ This function removes a client from a match and drops empty matches. """
+
+        match.remove_client(client_name)
+        if not match.get_connected_clients():
+            self.matches.pop(match.match_id, None)
+
+    @thread_safe
+    def close_match(self, match: Match) -> None:
+        """ This function removes an ended match. """
+        self.matches.pop(match.match_id, None)
+
+    @thread_safe
+    def restore_match(self, match_id: int, snapshot: dict) -> Match:
+        """ This function recreates a match persisted by a previous server run. """
+
+        match = self.create_match(match_id)
+        match.restore_snapshot(snapshot)
+        self.matches[match_id] = match
+        self.next_match_id = max(self.next_match_id, match_id + 1)
+
+        return match
+
+    @thread_safe
+    def get_match(self, match_id: int) -> Union[Match, None]:
+        """ This function returns a running match by its id. """
+        return self.matches.get(match_id)
+
+    @thread_safe
+    def get_matches(self) -> List[Match]:
+        """ This function returns running matches. """
+        return list(self.matches.values())
+
+
+class BaseServer(Network):
+    """
+      This class holds what servers share whatever their transport:
+      handshakes, connections, matches, matchmaking and requests.
+
+      Subclasses read frames from their clients and give them to
+      handle_frame, and write frames with write_message. Every
+      connection is a dict, subclasses keep their transport in it.
+      Names of connected players are unique, so matchmaking never
+      pairs two clients that can not play each other.
+
+      A server created with a state path persists its matches, after a
+      restart players can resume them within RESUME_TIMEOUT seconds.
+
+      Count and latency of every request type, bytes and gauges are kept
+      in a metrics registry. Local clients can read them with a metrics
+      request, and a server created with a metrics port serves them as
+      text over HTTP on localhost.
+
+      Log records are written by a background thread once server starts,
+      and requests are logged at the level of their type, so polling
+      clients do not make every request wait for log output.
+    """
+
+    def __init__(
+            self,
+            host_address: str,
+            host_port: int,
+            event_log_path: Union[str, None] = None,
+            state_path: Union[str, None] = None,
+            metrics_port: Union[int, None] = None) -> None:
+        self.host_address = host_address
+        self.host_port = host_port
+        self.lock = RLock()
+        self.registry = MatchRegistry(self.create_match)
+        self.matchmaker = Matchmaker(RATING_BAND_WIDTH)
+        self.event_log = EventLogWriter(event_log_path) if event_log_path else None
+        self.state_store = StateStore(state_path) if state_path else None
+        self.recovered_match_ids = set()
+        self.resume_deadline = None
+
+        self.request_log = RequestLogger()
+        self.metrics_port = metrics_port
+        self.metrics_endpoint = None
+        self.metrics = MetricsRegistry({
+            'connections': lambda: len(self.connections),
+            'matches': lambda: len(self.registry.get_matches()),
+            'queued_players': lambda: self.matchmaker.get_metrics()['queued_players']
+        })
+
+        # Connections are identified by match id and client name
+        self.connections = {}
+        self.player_names = set()
+
+    def create_match(self, match_id: int) -> Match:
+        """ This function creates a match whose messages go through this server. """
+        return Match(
+            match_id,
+            partial(self.send_data_to_client, match_id=match_id),
+            partial(self.send_data_to_clients, match_id=match_id),
+            partial(self.event_log.append, match_id) if self.event_log else None,
+            partial(self.state_store.save, match_id) if self.state_store else None)
+
+    def start_services(self) -> None:
+        """ This function starts logging, recovers persisted matches and serves metrics. """
+
+        configure_logging()
+        self.recover_matches()
+
+        if self.metrics_port:
+            self.metrics_endpoint = MetricsEndpoint(self.metrics, 'localhost', self.metrics_port)
+            self.metrics_endpoint.start()
+
+    def end_matches(self) -> None:
+        """ This function ends every match, they are persisted as they are before. """
+
+        if self.state_store:
+            self.state_store.close()
+
+        for match in self.registry.get_matches():
+            self.end_game(match)
+
+    def close_services(self) -> None:
+        """ This function closes state store, event log and metrics endpoint. """
+
+        if self.state_store:
+            self.state_store.close()
+
+        if self.event_log:
+            self.event_log.close()
+
+        if self.metrics_endpoint:
+            self.metrics_endpoint.stop()
+            self.metrics_endpoint = None
+
+    def recover_matches(self) -> None:
+        """ This function restores matches persisted by a previous server run. """
+
+        if not self.state_store:
+            return
+
+        for match_id, snapshot in self.state_store.recover().items():
+            self.registry.restore_match(match_id, snapshot)
+            self.recovered_match_ids.add(match_id)
+
+        self.resume_deadline = time.monotonic() + RESUME_TIMEOUT
+        logging.info(f'Recovered {len(self.recovered_match_ids)} matches')
+
+    @thread_safe
+    def expire_recovered_matches(self) -> None:
+        """ This function ends recovered matches whose players did not come back in time. """
+
+        for match_id in self.recovered_match_ids:
+            match = self.registry.get_match(match_id)
+            if match and not all(
+                (match_id, client_name) in self.connections
+                for client_name in match.get_connected_clients()
+            ):
+                logging.info(f'Players did not resume match {match_id}')
+                self.end_game(match)
+
+        self.recovered_match_ids.clear()
+
+    def run_matchmaking(self) -> None:
+        """
+          This function pairs queued clients, and expires recovered
+          matches once players had time to resume.
+        """
+
+        if self.recovered_match_ids and time.monotonic() > self.resume_deadline:
+            self.expire_recovered_matches()
+
+        pairs = self.matchmaker.pair_players()
+        for first_id, second_id in pairs:
+            self.pair_clients(first_id, second_id)
+
+        if pairs:
+            logging.info(
+                f'Matchmaking paired {len(pairs)} matches: {self.matchmaker.get_metrics()}')
+
+    @thread_safe
+    def read_handshake(
+            self,
+            data: Union[bytes, memoryview],
+            client_ip: object) -> Tuple[dict, Union[str, None]]:
+        """
+          This function decodes the handshake of a client. It returns the
+          settings of its connection and, if it is rejected, the reason.
+          Name of an accepted player is taken until its connection is
+          removed.
+        """
+
+        handshake = self.decode_data(data)
+        if not isinstance(handshake, dict):
+            if not isinstance(handshake, str):
+                logging.info(f'Invalid handshake, rejected client from IP: "{client_ip}"')
+                return {}, 'invalid_handshake'
+
+            # Clients that only send their name keep using JSON
+            return self.__take_player_name({
+                'client_name': handshake,
+                'rating': None,
+                'codec': DEFAULT_CODEC,
+                'pipelined': False,
+                'ack': 'Connected',
+                'joined_match': None,
+                'spectator': False
+            }, client_ip)
+
+        if not self.__is_valid_handshake(handshake):
+            logging.info(f'Invalid handshake, rejected client from IP: "{client_ip}"')
+            return {}, 'invalid_handshake'
+
+        codec = negotiate_codec(handshake.get('codecs', []))
+        pipelined = bool(handshake.get('pipelining'))
+        settings = {
+            'client_name': handshake['client_name'],
+            'rating': handshake.get('rating'),
+            'codec': codec,
+            'pipelined': pipelined,
+            'ack': {'message': 'Connected', 'codec': codec.name, 'pipelining': pipelined},
+            'joined_match': None,
+            'spectator': False
+        }
+
+        if handshake.get('spectate') is not None:
+            settings['joined_match'] = self.registry.get_match(handshake['spectate'])
+            settings['spectator'] = True
+            if (
+                not settings['joined_match']
+                or (settings['joined_match'].match_id, settings['client_name']) in self.connections
+            ):
+                logging.info(f'Rejected spectator from IP: "{client_ip}"')
+                return settings, 'cannot_spectate'
+
+            return settings, None
+
+        if handshake.get('resume'):
+            settings['joined_match'] = self.find_resumable_match(settings['client_name'])
+            if not settings['joined_match']:
+                logging.info(f'No match to resume for client from IP: "{client_ip}"')
+                return settings, 'cannot_resume'
+
+        return self.__take_player_name(settings, client_ip)
+
+    def open_connection(self, settings: dict, client_ip: object, transport: dict) -> dict:
+        """
+          This function keeps the connection of an accepted client,
+          acknowledges its handshake and queues it for matchmaking
+          unless it spectates or resumes a match. If it fails, the name,
+          connection and match taken for the client are released.
+        """
+
+        client_name = settings['client_name']
+        joined_match = settings['joined_match']
+        connection = None
+        try:
+            connection = self.__add_client_to_server(
+                client_name, transport, settings['rating'], joined_match, settings['spectator'])
+
+            # Ack is sent before negotiated codec is in use
+            self.send_data_to_client(settings['ack'], client_name, connection['match'].match_id)
+            connection['codec'] = settings['codec']
+            connection['pipelined'] = settings['pipelined']
+
+            logging.info(
+                f'Client "{client_name}" connected from IP: "{client_ip}"')
+
+            if connection['spectator']:
+                joined_match.add_spectator(client_name)
+            elif joined_match:
+                logging.info(f'Client "{client_name}" resumed match {joined_match.match_id}')
+            else:
+                self.matchmaker.enqueue(
+                    self.__connection_id(connection), connection['rating'], connection['enqueued_at'])
+        except Exception:
+            if connection is None:
+                if not settings['spectator']:
+                    self.player_names.discard(client_name)
+            else:
+                self.remove_connection(connection)
+                if not connection['spectator']:
+                    self.end_game(connection['match'])
+            raise
+
+        return connection
+
+    def handle_frame(
+            self,
+            connection: dict,
+            data: Union[bytes, memoryview],
+            client_ip: object) -> bool:
+        """
+          This function processes a frame received from a client and
+          records it in metrics. It returns False if client asked to
+          disconnect.
+        """
+
+        started_at = time.perf_counter()
+        frame_size = FRAME_HEADER.size + len(data)
+        client_name = connection['client_name']
+        request_id = None
+        if connection['pipelined']:
+            request_id, data = self.split_request_id(data)
+
+        decoded_data = self.decode_data(data, connection['codec'])
+        request_type = self.get_request_type(decoded_data)
+        self.request_log.log_request(client_name, request_type, decoded_data)
+
+        # Gauges lock the registry, so metrics are read before match is locked
+        if request_type == 'metrics':
+            response = self.get_metrics_response(client_ip)
+
+        with self.lock_match(connection) as match:
+            if request_type == 'metrics':
+                keep_connected = True
+                self.send_data_to_client(response, client_name, match.match_id, request_id)
+            elif connection['spectator']:
+                keep_connected = match.handle_spectator_request(
+                    client_name, decoded_data, request_id)
+            else:
+                keep_connected = match.handle_request(
+                    client_name, decoded_data, request_id)
+
+        self.metrics.record_request(
+            request_type, time.perf_counter() - started_at, frame_size)
+
+        return keep_connected
+
+    def get_request_type(self, decoded_data: object) -> str:
+        """ This function returns the name metrics use for a request. """
+
+        if isinstance(decoded_data, dict) and 'request' in decoded_data:
+            request = decoded_data['request']
+            if isinstance(request, str) and request in REQUEST_TYPES:
+                return request
+            return 'unknown'
+
+        return 'message'
+
+    def get_metrics_response(self, client_ip: object) -> dict:
+        """ This function answers a metrics request, only local clients can read metrics. """
+
+        if is_loopback(client_ip):
+            return {'metrics': self.metrics.get_metrics()}
+
+        return {'message': 'forbidden'}
+
+    @contextmanager
+    def lock_match(self, connection: dict) -> Iterator[Match]:
+        """
+          This function holds the lock of the match of a client. Client
+          is moved to another match when it is paired, so its match is
+          read again once the lock is held.
+        """
+
+        while True:
+            match = connection['match']
+            match.lock.acquire()
+            if connection['match'] is match:
+                break
+
+            match.lock.release()
+
+        try:
+            yield match
+        finally:
+            match.lock.release()
+
+    @thread_safe
+    def pair_clients(self, first_id: Tuple[int, str], second_id: Tuple[int, str]) -> None:
+        """
+          This function moves second client to the match of the first one.
+          Clients that can not be paired are queued again if they still
+          wait for an opponent.
+        """
+
+        first = self.connections.get(first_id)
+        second = self.connections.get(second_id)
+
+        if not (first and second and first['match'].can_join(second['client_name'])):
+            waiting = [
+                (connection_id, connection)
+                for connection_id, connection in ((first_id, first), (second_id, second))
+                if connection and connection['match'].is_waiting_for_players()
+            ]
+            for index, (connection_id, connection) in enumerate(waiting):
+                # Two waiting clients that can not play each other are not
+                # popped together again, second one is queued last
+                enqueued_at = time.monotonic() if index else connection['enqueued_at']
+                self.matchmaker.enqueue(connection_id, connection['rating'], enqueued_at)
+            return
+
+        # Listeners read match of a connection under its lock
+        match = first['match']
+        source = second['match']
+        with source.lock, match.lock:
+            self.registry.move_client(second['client_name'], source, match)
+
+            del self.connections[second_id]
+            second['match'] = match
+            self.connections[self.__connection_id(second)] = second
+
+        match.push_game_status()
+        match.push_turns()
+
+    def send_data_to_clients(
+            self,
+            data: object,
+            client_names: List[str],
+            match_id: int) -> None:
+        """
+          This function sends an event to several clients of a match.
+          Event is encoded once for every codec in use and the same
+          frame is written to every client using that codec.
+        """
+
+        messages = {}
+        for client_name in client_names:
+            connection = self.connections.get((match_id, client_name))
+            if not connection:
+                continue
+
+            message_key = (connection['codec'].name, connection['pipelined'])
+            if message_key not in messages:
+                messages[message_key] = self.create_datagram(
+                    data, connection['codec'], self.__response_id(connection, EVENT_REQUEST_ID))
+
+            self.write_message(connection, messages[message_key])
+
+    def send_data_to_client(
+            self,
+            data: object,
+            client_name: str,
+            match_id: int,
+            request_id: int = EVENT_REQUEST_ID) -> None:
+        """
+          This function writes data to a specific client, so sender
+          never waits for the client socket.
+        """
+
+        connection = self.connections[(match_id, client_name)]
+        message = self.create_datagram(
+            data, connection['codec'], self.__response_id(connection, request_id))
+        self.write_message(connection, message)
+
+    def write_message(self, connection: dict, message: bytes) -> None:
+        """ This function writes a frame to a client through the transport of a subclass. """
+        raise NotImplementedError
+
+    def close_client(self, connection: dict) -> None:
+        """ This function closes the transport of a client, it is implemented by subclasses. """
+        raise NotImplementedError
+
+    @thread_safe
+    def end_game(self, match: Match) -> None:
+        """ This function ends a match by closing its clients connections. """
+
+        for client_name in match.get_connected_clients() + match.get_spectators():
+            connection = self.connections.get((match.match_id, client_name))
+            if connection:
+                self.close_client(connection)
+
+        match.end_game()
+        self.registry.close_match(match)
+
+    @thread_safe
+    def find_resumable_match(self, client_name: str) -> Union[Match, None]:
+        """ This function finds a recovered match where a client is not connected yet. """
+
+        for match_id in self.recovered_match_ids:
+            match = self.registry.get_match(match_id)
+            if (
+                match
+                and client_name in match.get_connected_clients()
+                and (match_id, client_name) not in self.connections
+            ):
+                return match
+
+        return None
+
+    def get_connected_clients(self) -> List[str]:
+        """ This function returns connected clients of every match. """
+        return [
+            client_name
+            for match in self.registry.get_matches()
+            for client_name in match.get_connected_clients()
+        ]
+
+    @thread_safe
+    def remove_connection(self, connection: dict) -> None:
+        """ This function removes client from its match and forgets its connection. """
+
+        connection_id = self.__connection_id(connection)
+        if connection['spectator']:
+            connection['match'].remove_spectator(connection['client_name'])
+        else:
+            self.matchmaker.remove(connection_id)
+            self.registry.leave_match(connection['match'], connection['client_name'])
+            self.player_names.discard(connection['client_name'])
+
+        self.connections.pop(connection_id, None)
+
+    @thread_safe
+    def __add_client_to_server(
+            self,
+            client_name: str,
+            transport: dict,
+            rating: int,
+            joined_match: Union[Match, None] = None,
+            is_spectator: bool = False) -> dict:
+        """
+          This function opens a match lobby for a client, or joins the
+          match it spectates or resumes, and keeps its connection.
+        """
+
+        connection = {
+            'client_name': client_name,
+            'codec': DEFAULT_CODEC,
+            'pipelined': False,
+            'spectator': is_spectator,
+            'match': joined_match or self.registry.open_match(client_name),
+            'rating': rating,
+            'enqueued_at': time.monotonic(),
+            # Set once server closes the connection itself to end its match
+            'closed_by_server': False,
+            **transport
+        }
+        self.connections[self.__connection_id(connection)] = connection
+
+        return connection
+
+    def __take_player_name(
+            self,
+            settings: dict,
+            client_ip: object) -> Tuple[dict, Union[str, None]]:
+        """ This function takes the name of a player, unless a connected player has it. """
+
+        if settings['client_name'] in self.player_names:
+            logging.info(f'Name taken, rejected client from IP: "{client_ip}"')
+            return settings, 'name_taken'
+
+        self.player_names.add(settings['client_name'])
+        return settings, None
+
+    def __is_valid_handshake(self, handshake: dict) -> bool:
+        """ This function checks the name and rating a client sent in its handshake. """
+
+        rating = handshake.get('rating')
+        return (
+            isinstance(handshake.get('client_name'), str)
+            and (rating is None or (
+                type(rating) in (int, float) and math.isfinite(rating)))
+        )
+
+    def __response_id(self, connection: dict, request_id: int) -> Union[int, None]:
+        """ This function returns the request id a frame is tagged with, if any. """
+        return request_id if connection['pipelined'] else None
+
+    def __connection_id(self, connection: dict) -> Tuple[int, str]:
+        """ This function returns the key of a connection. """
+        return connection['match'].match_id, connection['client_name']
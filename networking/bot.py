@@ -0,0 +1,162 @@
+import time
+import random
+import logging
+import argparse
+import threading
+from typing import List
+
+from networking.client import Client
+from engine.fleet import random_fleet
+from engine.strategies import HuntTargetStrategy, STRATEGIES
+from networking.log_pipeline import configure_logging
+from networking.constants import EVENT_WAIT_TIMEOUT, GameStatus
+
+
+class Bot:
+    """
+      This class plays games without a window through a Client.
+
+      Bot subscribes to game events, places a random fleet, attacks
+      with a strategy on its turn and, once a game ends, the winner asks
+      for a rematch with reset_game until every bot played its games.
+    """
+
+    def __init__(
+            self,
+            client_name: str,
+            host_address: str,
+            host_port: int,
+            games: int = 1,
+            think_time: float = 0.0,
+            strategy_class: type = HuntTargetStrategy) -> None:
+        self.client = Client(client_name, host_address, host_port)
+        self.games = games
+        self.think_time = think_time
+        self.rng = random.Random(client_name)
+        self.strategy = strategy_class(self.rng)
+
+        self.fleet_locked = False
+        self.in_battle = False
+        self.games_played = 0
+        self.wins = 0
+        self.shots = 0
+
+    def run(self) -> None:
+        """ This function connects bot and plays its games. """
+
+        if not self.client.connect_to_server():
+            return
+
+        self.client.subscribe()
+        try:
+            while self.games_played < self.games and not self.client.is_disconnected:
+                # Waits for events instead of spinning while it is not bot turn
+                self.client.poll_events(EVENT_WAIT_TIMEOUT)
+                self.client.pop_events()
+                if self.client.game_status == GameStatus['player_disconnected'].name:
+                    break
+
+                self.play_turn()
+                if self.think_time:
+                    time.sleep(self.think_time)
+
+            # Server closes a match once a player leaves, even right after it ended
+            if self.in_battle:
+                self.finish_game()
+        finally:
+            self.client.disconnect()
+
+    def play_turn(self) -> None:
+        """ This function does what current game status asks for, if anything. """
+
+        game_status = self.client.game_status
+
+        # Game ended, a rematch may already be in ship lock
+        if self.in_battle and (
+            self.client.winner
+            or game_status in (GameStatus['finished'].name, GameStatus['ship_lock'].name)
+        ):
+            self.finish_game()
+
+        if game_status == GameStatus['ship_lock'].name and not self.fleet_locked:
+            self.fleet_locked = self.client.lock_ships(random_fleet(self.rng))
+        elif game_status == GameStatus['battle'].name and self.fleet_locked:
+            self.in_battle = True
+            if self.client.my_turn:
+                self.attack()
+
+    def attack(self) -> None:
+        """ This function attacks the tile chosen by strategy. """
+
+        position = self.strategy.next_shot()
+        response = self.client.attack_enemy_tile_async(position).result()
+        if not response or 'attacked' not in response:
+            return
+
+        self.shots += 1
+        self.strategy.record_shot(position, response['attacked'], response['sunk'])
+
+        # Winner knows right away, loser may leave before winner event arrives
+        if response['game_over']:
+            self.finish_game(won=True)
+
+    def finish_game(self, won: bool = False) -> None:
+        """ This function counts a finished game and, if bot won, asks for a rematch. """
+
+        self.games_played += 1
+        self.fleet_locked = False
+        self.in_battle = False
+        self.strategy.reset()
+
+        if won:
+            self.wins += 1
+            if self.games_played < self.games:
+                self.client.reset_game()
+
+
+def run_bots(
+        bots: int,
+        host_address: str,
+        host_port: int,
+        games: int = 1,
+        think_time: float = 0.0,
+        strategy_name: str = 'hunt_target') -> List[Bot]:
+    """ This function runs bots at once, each on its own thread, until all of them finish. """
+
+    players = [
+        Bot(f'bot-{number}', host_address, host_port, games, think_time,
+            STRATEGIES[strategy_name])
+        for number in range(bots)
+    ]
+    bot_threads = [threading.Thread(target=bot.run, daemon=True) for bot in players]
+
+    for bot_thread in bot_threads:
+        bot_thread.start()
+    for bot_thread in bot_threads:
+        bot_thread.join()
+
+    return players
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play games with headless bots.')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=65432)
+    parser.add_argument('--bots', type=int, default=2)
+    parser.add_argument('--games', type=int, default=1, help='games played by every bot')
+    parser.add_argument('--think-time', type=float, default=0.01,
+                        help='seconds waited between bot actions')
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), default='hunt_target')
+    arguments = parser.parse_args()
+
+    configure_logging(logging.WARNING)
+    started_at = time.perf_counter()
+    players = run_bots(
+        arguments.bots, arguments.host, arguments.port,
+        arguments.games, arguments.think_time, arguments.strategy)
+
+    games = sum(bot.wins for bot in players)
+    shots = sum(bot.shots for bot in players)
+    print(
+        f'{games} games won in {time.perf_counter() - started_at:.2f}s, '
+        f'{shots / max(games, 1) / 2:.1f} shots per player and game')
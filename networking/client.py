@@ -1,9 +1,14 @@
+import queue
 import socket
 import logging
+from threading import Thread, Lock
+from collections import deque
+from concurrent.futures import Future, TimeoutError
 from typing import Union, List, Tuple
 
-from networking.network import Network
-from networking.constants import BUFFER_SIZE
+from networking.constants import SUPPORTED_CODECS, REQUEST_TIMEOUT
+from networking.network import (
+    Network, FrameReader, CODECS, DEFAULT_CODEC, EVENT_REQUEST_ID)
 
 
 logging.basicConfig(format='%(asctime)s - %(message)s',
@@ -12,16 +17,60 @@ logging.root.setLevel(logging.NOTSET)
 
 
 class Client(Network):
-    """ This function represents client instance. """
+    """
+      This function represents client instance.
 
-    def __init__(self, client_name: str, host_address: str, host_port: int) -> None:
+      Once connected, an I/O thread reads every frame sent by server.
+      Responses complete the futures returned by request, and pushed
+      events are queued until poll_events applies them, so the game
+      loop never waits for server.
+
+      Requests are pipelined: every request carries an id echoed by
+      its response, so many requests can be in flight at once and
+      responses are matched in whatever order they arrive.
+
+      A client created with the id of a running match spectates it,
+      it gets every event of that match without playing. A client
+      created with resume rejoins the match it was playing before
+      server restarted.
+    """
+
+    def __init__(
+            self,
+            client_name: str,
+            host_address: str,
+            host_port: int,
+            rating: Union[int, None] = None,
+            spectate: Union[int, None] = None,
+            resume: bool = False) -> None:
         self.is_disconnected = False
         self.client_name = client_name
+        self.rating = rating
+        self.spectate = spectate
+        self.resume = resume
 
         self.server_socket = None
+        self.frame_reader = None
+        self.codec = DEFAULT_CODEC
         self.host_port = host_port
         self.host_address = host_address
 
+        self.io_thread = None
+        self.send_lock = Lock()
+        self.is_pipelined = False
+        self.next_request_id = EVENT_REQUEST_ID + 1
+        self.pending_requests = {}
+        self.incoming_events = queue.Queue()
+        self.pending_sync = None
+
+        # Game state kept up to date by events pushed from server
+        self.is_subscribed = False
+        self.game_status = None
+        self.my_turn = False
+        self.winner = None
+        self.events = deque()
+        self.last_enemy_attack = None
+
     def connect_to_server(self) -> bool:
         """ This function creates a socket to connect to game server. """
 
@@ -31,15 +80,52 @@ class Client(Network):
             self.server_socket = socket.socket(
                 socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.connect((self.host_address, self.host_port))
+            self.server_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.frame_reader = FrameReader(self.server_socket)
+
+            # Handshake is JSON encoded, then negotiated codec is used
+            handshake = {
+                'client_name': self.client_name,
+                'codecs': SUPPORTED_CODECS,
+                'pipelining': True
+            }
+            if self.rating is not None:
+                handshake['rating'] = self.rating
+            if self.spectate is not None:
+                handshake['spectate'] = self.spectate
+            if self.resume:
+                handshake['resume'] = True
 
-            ack = self.send_data_to_server(self.client_name)
+            self.server_socket.sendall(self.create_datagram(handshake))
+            ack = self.decode_data(self.frame_reader.read_frame())
             logging.info(f'Server ACK: {ack}')
 
+            if ack in (
+                {'message': 'server_full'},
+                {'message': 'cannot_spectate'},
+                {'message': 'cannot_resume'},
+                {'message': 'name_taken'},
+                {'message': 'invalid_handshake'}
+            ):
+                self.server_socket.close()
+                return False
+
+            self.codec = CODECS[ack['codec']]
+            self.is_pipelined = ack.get('pipelining', False)
+
+            # Spectators get every event without asking for them
+            self.is_subscribed = self.spectate is not None
+
+            self.io_thread = Thread(target=self.io_listener, daemon=True)
+            self.io_thread.start()
+
             return True
         except TypeError as error:
             logging.error(error)
         except ValueError as error:
             logging.error(error)
+        except KeyError as error:
+            logging.error(f'Unknown codec: {error}')
         except socket.error as error:
             logging.error(error)
 
@@ -49,63 +135,259 @@ class Client(Network):
         """ This function send a disconnected request to server. """
 
         self.is_disconnected = True
-        self.send_data_to_server({'request': 'disconnect'})
+        self.request({'request': 'disconnect'})
         logging.info('Client disconnected')
 
-    def send_data_to_server(self, data: object) -> Union[dict, None]:
-        """ This function sends data and receive response from server. """
+    def io_listener(self) -> None:
+        """
+          This function runs on I/O thread, it reads frames until
+          connection is closed and dispatches responses and events.
+        """
+
+        try:
+            while True:
+                frame = self.frame_reader.read_frame()
+                if frame is None:
+                    break
+
+                request_id = None
+                if self.is_pipelined:
+                    request_id, frame = self.split_request_id(frame)
+
+                decoded_data = self.decode_data(frame, self.codec)
+                if self.__is_event(decoded_data):
+                    self.incoming_events.put(decoded_data)
+                else:
+                    self.__pop_pending_request(request_id).set_result(decoded_data)
+        except Exception as error:
+            # A frame that can not be read ends connection like a closed socket
+            if not isinstance(error, socket.error):
+                logging.error(f'Invalid frame from server: {error!r}')
+                self.server_socket.close()
+
+        logging.info('Client disconnected by server')
+        self.is_disconnected = True
+
+        # Requests without response are completed so nobody waits forever
+        with self.send_lock:
+            for future in self.pending_requests.values():
+                future.set_result(None)
+            self.pending_requests.clear()
+
+    def request(self, data: object) -> Future:
+        """
+          This function sends data to server without waiting for its
+          response, which completes the returned future.
+        """
+        return self.request_batch([data])[0]
+
+    def request_batch(self, requests: List[object]) -> List[Future]:
+        """
+          This function sends several requests with a single write,
+          returning a future for the response of each one.
+        """
+
+        futures = [Future() for _ in requests]
+        with self.send_lock:
+            if self.is_disconnected and requests != [{'request': 'disconnect'}]:
+                for future in futures:
+                    future.set_result(None)
+                return futures
+
+            request_ids = []
+            message = bytearray()
+            for data, future in zip(requests, futures):
+                request_id = self.next_request_id
+                self.next_request_id += 1
+                self.pending_requests[request_id] = future
+                request_ids.append(request_id)
+
+                message += self.create_datagram(
+                    data, self.codec, request_id if self.is_pipelined else None)
+
+            try:
+                self.server_socket.sendall(message)
+            except socket.error:
+                logging.info('Client disconnected by server')
+                self.is_disconnected = True
+                for request_id, future in zip(request_ids, futures):
+                    self.pending_requests.pop(request_id, None)
+                    future.set_result(None)
+
+        return futures
+
+    def send_data_to_server(
+            self,
+            data: object,
+            timeout: float = REQUEST_TIMEOUT) -> Union[dict, None]:
+        """
+          This function sends data and waits for server response. None
+          is returned if server does not answer within timeout seconds.
+        """
+
+        try:
+            return self.request(data).result(timeout)
+        except TimeoutError:
+            logging.error(f'No response from server to: {data}')
+            return None
+
+    def subscribe(self) -> None:
+        """
+          Ask server to push game changes, so game status, turn and
+          winner are kept up to date without polling.
+        """
+
+        self.is_subscribed = True
+        self.send_data_to_server({'request': 'subscribe'})
+
+    def poll_events(self, timeout: float = 0.0) -> None:
+        """
+          Apply events pushed by server, waiting up to timeout seconds
+          for the first one. Clients that are not subscribed keep a single
+          sync request in flight and apply its response once it arrives.
+        """
 
         try:
-            message = self.create_datagram(BUFFER_SIZE, data)
-            self.server_socket.sendall(message)
+            if timeout > 0:
+                self.__apply_event(self.incoming_events.get(timeout=timeout))
+            while True:
+                self.__apply_event(self.incoming_events.get_nowait())
+        except queue.Empty:
+            pass
+
+        if self.is_subscribed:
+            return
+
+        if self.pending_sync and self.pending_sync.done():
+            self.__apply_sync(self.pending_sync.result())
+            self.pending_sync = None
+
+        if self.pending_sync is None:
+            self.pending_sync = self.request({'request': 'sync'})
 
-            response = self.server_socket.recv(BUFFER_SIZE)
-            if response:
-                return self.decode_data(response)
-        except socket.error:
-            logging.info('Client disconnected by server')
-            self.is_disconnected = True
+    def pop_events(self) -> List[dict]:
+        """ Return queued attack events and clear the queue. """
 
-        return None
+        events = list(self.events)
+        self.events.clear()
 
-    def lock_ships(self, game_grid: List[list]) -> None:
-        """ Notify to server that client locked ships and send game grid """
-        self.send_data_to_server({'request': 'ship_locked', 'grid': game_grid})
+        return events
 
-    def attack_enemy_tile(self, position: Tuple[float, float]) -> str:
+    def lock_ships(self, fleet: List[list]) -> bool:
+        """
+          Notify to server that client locked ships and send fleet as
+          [ship_name, x, y, is_vertical] placements. It returns if
+          server accepted the fleet.
+        """
+
+        response = self.send_data_to_server({'request': 'ship_locked', 'fleet': fleet})
+        return bool(response) and response.get('message') == 'ok'
+
+    def attack_enemy_tile(self, position: Tuple[int, int]) -> str:
         """ Request an attack to enemy grid. """
         
         response = self.send_data_to_server({'request': 'attack_tile', 'position': position})
-        return response.get('attacked')
+        return response and response.get('attacked')
+
+    def attack_enemy_tile_async(self, position: Tuple[int, int]) -> Future:
+        """
+          Request an attack to enemy grid without waiting for response.
+          Turn is given away right now, so a second attack can not be
+          sent before server confirms the first one.
+        """
+
+        self.my_turn = False
+        return self.request({'request': 'attack_tile', 'position': position})
 
     def is_my_turn(self) -> bool:
         """ This function checks if it is client turn. """
 
         game_data = self.get_game_data()
-        return game_data[self.client_name]['my_turn']
-
-    def ship_sinked(self) -> None:
-        """ Notify that a ship is sinked. """
-        self.send_data_to_server({'request': 'ship_sinked'})
+        return bool(game_data) and game_data[self.client_name]['my_turn']
 
     def get_game_data(self) -> Union[dict, None]:
         """ Request current game data to server. """
 
         response = self.send_data_to_server({'request': 'game_data'})
-        return response
+        return response and response.get('clients')
+
+    def sync(self) -> Union[dict, None]:
+        """
+          Request in one round trip client turn, last tile attacked
+          by enemy, game status and winner.
+        """
+        return self.send_data_to_server({'request': 'sync'})
 
     def get_game_status(self) -> Union[dict, None]:
         """ Request to server if game started. """
 
         response = self.send_data_to_server({'request': 'game_status'})
-        return response.get('game_status')
+        return response and response.get('game_status')
 
     def get_winner(self) -> Union[dict, None]:
         """ Request to server winner username. """
 
         response = self.send_data_to_server({'request': 'winner'})
-        return response.get('winner')
+        return response and response.get('winner')
+
+    def get_metrics(self) -> Union[dict, None]:
+        """ Request server metrics, only answered to clients on server host. """
+
+        response = self.send_data_to_server({'request': 'metrics'})
+        return response and response.get('metrics')
 
     def reset_game(self) -> None:
         """ Request to reset game. """
         self.send_data_to_server({'request': 'reset_game'})
+
+    def __pop_pending_request(self, request_id: Union[int, None]) -> Future:
+        """
+          This function pops the future answered by a response. Servers
+          without pipelining answer requests in the order they were sent.
+        """
+
+        with self.send_lock:
+            if request_id is None:
+                request_id = next(iter(self.pending_requests), None)
+
+            return self.pending_requests.pop(request_id)
+
+    def __is_event(self, data: object) -> bool:
+        """ This function checks if data is an event pushed by server. """
+        return isinstance(data, dict) and 'event' in data
+
+    def __apply_sync(self, sync_data: Union[dict, None]) -> None:
+        """ This function updates client game state with a sync response. """
+
+        if not sync_data:
+            return
+
+        self.__apply_event(
+            {'event': 'game_status', 'game_status': sync_data['game_status']})
+        self.my_turn = sync_data['my_turn']
+        self.winner = sync_data['winner']
+
+        # Enemy last attack is repeated on every sync until a new one happens
+        attacked_tile = sync_data['attacked_tile']
+        if attacked_tile['position'] is None:
+            self.last_enemy_attack = None
+        elif attacked_tile != self.last_enemy_attack:
+            self.last_enemy_attack = attacked_tile
+            self.events.append({'event': 'attacked', **attacked_tile})
+
+    def __apply_event(self, event: dict) -> None:
+        """ This function updates client game state with a pushed event. """
+
+        if event['event'] == 'game_status':
+            self.game_status = event['game_status']
+
+            # A new game starts, so previous game events are stale
+            if self.game_status == 'ship_lock':
+                self.winner = None
+                self.events.clear()
+        elif event['event'] == 'turn':
+            self.my_turn = event['my_turn']
+        elif event['event'] == 'winner':
+            self.winner = event['winner']
+        else:
+            self.events.append(event)
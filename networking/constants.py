@@ -1,3 +1,67 @@
-CONN_LIMIT = 2
+import enum
+import logging
+
+CONN_LIMIT = 512
+
+# Seconds a new connection has to send its handshake
+HANDSHAKE_TIMEOUT = 10
+
+# Matchmaking pairs queued players every interval (seconds), rated
+# players are only paired with players of the same rating band
+MATCHMAKING_INTERVAL = 0.25
+RATING_BAND_WIDTH = 200
 BUFFER_SIZE = 4096
-SHIPS_NAMES = ['B', 'C', 'D', 'R', 'S']
+MAX_FRAME_SIZE = 1024 * 1024
+
+# Frames waiting to be sent to a client are bounded, clients that can not
+# keep up are disconnected instead of delaying everyone else
+SEND_QUEUE_SIZE = 256
+SEND_BUFFER_LIMIT = 1024 * 1024
+SEND_DRAIN_TIMEOUT = 1.0
+
+# Match state is committed to disk in groups every interval (seconds) and
+# checkpointed every number of records. Players of matches recovered after
+# a restart have RESUME_TIMEOUT seconds to reconnect
+STATE_COMMIT_INTERVAL = 0.005
+STATE_CHECKPOINT_RECORDS = 10000
+RESUME_TIMEOUT = 60
+
+# Requests servers answer, metrics count any other request as 'unknown'
+# so clients can not create a histogram per request name
+REQUEST_TYPES = {
+    'ship_locked', 'reset_game', 'subscribe', 'disconnect', 'game_data',
+    'game_status', 'winner', 'sync', 'attack_tile', 'metrics'
+}
+
+# Servers hand log records to a writer thread through a bounded queue,
+# records are dropped once it is full. Requests are logged at the level
+# of their type, polled ones only once every sample rate requests
+LOG_QUEUE_SIZE = 10000
+REQUEST_LOG_LEVELS = {
+    'game_status': logging.DEBUG,
+    'game_data': logging.DEBUG,
+    'winner': logging.DEBUG,
+    'sync': logging.DEBUG,
+    'metrics': logging.DEBUG
+}
+REQUEST_LOG_SAMPLE_RATES = {
+    'game_status': 100,
+    'game_data': 100,
+    'winner': 100
+}
+# Codecs offered by clients at connect time, most preferred first
+SUPPORTED_CODECS = ['binary', 'json']
+
+# Seconds a client waits for the response of a blocking request
+REQUEST_TIMEOUT = 10
+
+# Seconds a bot waits for a pushed event before checking its game again
+EVENT_WAIT_TIMEOUT = 0.1
+
+
+class GameStatus(enum.Enum):
+    lobby = 1
+    ship_lock = 2
+    battle = 3
+    finished = 4
+    player_disconnected = 5
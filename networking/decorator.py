@@ -1,24 +1,21 @@
-import threading
+import functools
 from typing import Callable
 
 
 def thread_safe(function: Callable) -> Callable:
     """
       This decorator makes sure that the decorated
-      function is thread safe.
-    """
-
-    lock = threading.Lock()
+      method is thread safe.
 
-    def wrapper(*args, **kwargs):
-        lock.acquire()
-        try:
-            response = function(*args, **kwargs)
-        except Exception as error:
-            raise error
-        finally:
-            lock.release()
+      Decorated methods hold the lock of their own instance,
+      so every instance needs a re-entrant lock in self.lock.
+      Methods of the same instance exclude each other while
+      different instances never contend.
+    """
 
-        return response
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return function(self, *args, **kwargs)
 
     return wrapper
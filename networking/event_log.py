@@ -0,0 +1,356 @@
+import os
+import sys
+import mmap
+import time
+import struct
+import threading
+from typing import Dict, Iterator, List, Tuple, Union
+
+from networking.network import BinaryCodec
+from networking.decorator import thread_safe
+
+
+# Log starts with LOG_MAGIC, then records follow. A cleanly closed log
+# ends with a directory record and a trailer pointing to its last index
+# block and to its directory
+LOG_MAGIC = b'BSEVLOG1'
+TRAILER_MAGIC = b'BSEVEND2'
+TRAILER = struct.Struct('!8sQQ')
+
+# Every record is a header followed by its payload
+RECORD = struct.Struct('!BIIdI')
+RECORD_EVENT = 1
+RECORD_INDEX = 2
+RECORD_DIRECTORY = 3
+
+# Index blocks are written every INDEX_INTERVAL events. An index block
+# holds the offset of previous index block, the range of match ids it
+# covers and an entry per event of its segment sorted by match and turn
+INDEX_INTERVAL = 256
+INDEX_HEADER = struct.Struct('!QIII')
+INDEX_ENTRY = struct.Struct('!IIQ')
+NO_INDEX = 0
+
+# The directory holds an entry per match and index block holding events
+# of that match, sorted by match id and block offset
+DIRECTORY_ENTRY = struct.Struct('!IQ')
+
+
+class EventLogWriter:
+    """
+      This class appends match events to a binary log file.
+
+      Events are encoded with the binary codec, so frequent events like
+      attacks take a few bytes. Every INDEX_INTERVAL events an index block
+      is appended, which lets EventLogReader find the events of a match
+      without reading the whole log.
+
+      An existing log is reopened for append: its directory and trailer,
+      or a partially written last record, are cut off and writing goes on
+      after its last complete record.
+    """
+
+    def __init__(self, log_path: str) -> None:
+        self.lock = threading.RLock()
+        self.codec = BinaryCodec()
+
+        self.last_index_offset = NO_INDEX
+        self.pending_entries = []
+        # Offsets of the index blocks holding events of every match
+        self.match_blocks = {}
+
+        if os.path.exists(log_path) and os.path.getsize(log_path) > 0:
+            with EventLogReader(log_path) as reader:
+                self.offset = reader.append_offset
+                self.last_index_offset = reader.last_index_offset
+                self.pending_entries = list(reader.unindexed_entries)
+                self.match_blocks = reader.get_match_blocks()
+
+            self.log_file = open(log_path, 'r+b')
+            self.log_file.truncate(self.offset)
+            self.log_file.seek(self.offset)
+        else:
+            self.log_file = open(log_path, 'wb')
+            self.log_file.write(LOG_MAGIC)
+            self.offset = len(LOG_MAGIC)
+
+    @thread_safe
+    def append(self, match_id: int, turn: int, event: dict) -> None:
+        """ This function appends an event of a match at a turn. """
+
+        if self.log_file.closed:
+            return
+
+        self.pending_entries.append((match_id, turn, self.offset))
+        self.__write_record(RECORD_EVENT, match_id, turn, self.codec.encode(event))
+
+        if len(self.pending_entries) >= INDEX_INTERVAL:
+            self.__write_index()
+
+    @thread_safe
+    def close(self) -> None:
+        """ This function indexes pending events, writes directory and trailer and closes log. """
+
+        if self.log_file.closed:
+            return
+
+        if self.pending_entries:
+            self.__write_index()
+
+        directory_offset = self.offset
+        self.__write_record(RECORD_DIRECTORY, 0, 0, b''.join(
+            DIRECTORY_ENTRY.pack(match_id, block_offset)
+            for match_id in sorted(self.match_blocks)
+            for block_offset in self.match_blocks[match_id]))
+
+        self.log_file.write(
+            TRAILER.pack(TRAILER_MAGIC, self.last_index_offset, directory_offset))
+        self.log_file.close()
+
+    def __write_index(self) -> None:
+        """ This function appends an index block of events written since last one. """
+
+        entries = sorted(self.pending_entries)
+        payload = INDEX_HEADER.pack(
+            self.last_index_offset, len(entries), entries[0][0], entries[-1][0])
+        payload += b''.join(INDEX_ENTRY.pack(*entry) for entry in entries)
+
+        for match_id in sorted({entry[0] for entry in entries}):
+            self.match_blocks.setdefault(match_id, []).append(self.offset)
+
+        self.last_index_offset = self.offset
+        self.pending_entries = []
+        self.__write_record(RECORD_INDEX, 0, 0, payload)
+        self.log_file.flush()
+
+    def __write_record(self, record_type: int, match_id: int, turn: int, payload: bytes) -> None:
+        """ This function appends a record header and its payload. """
+
+        self.log_file.write(
+            RECORD.pack(record_type, match_id, turn, time.time(), len(payload)))
+        self.log_file.write(payload)
+        self.offset += RECORD.size + len(payload)
+
+
+class EventLogReader:
+    """
+      This class reads a log written by EventLogWriter through a memory
+      map, so only the pages that are read are loaded.
+
+      The index blocks of a match are found by bisecting the directory
+      the trailer points to. Logs without trailer, like the log of a
+      crashed server, are scanned once record header by record header,
+      and events written after their last index block are indexed in
+      memory.
+    """
+
+    def __init__(self, log_path: str) -> None:
+        self.log_file = open(log_path, 'rb')
+        self.log_map = mmap.mmap(self.log_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.log_map[:len(LOG_MAGIC)] != LOG_MAGIC:
+            self.close()
+            raise ValueError(f'Not an event log: {log_path}')
+
+        self.codec = BinaryCodec()
+        # Events and index blocks end at data_end, a writer appends from there
+        self.data_end = len(self.log_map)
+        self.last_index_offset = NO_INDEX
+
+        # Directory entries as (entries offset, entries count), or index
+        # block offsets of every match for logs without trailer
+        self.directory = None
+        self.match_blocks = {}
+        self.unindexed_entries = []
+
+        trailer_offset = len(self.log_map) - TRAILER.size
+        if (
+            trailer_offset >= len(LOG_MAGIC)
+            and self.log_map[trailer_offset:trailer_offset + len(TRAILER_MAGIC)] == TRAILER_MAGIC
+        ):
+            _, self.last_index_offset, directory_offset = TRAILER.unpack_from(
+                self.log_map, trailer_offset)
+            payload_size = RECORD.unpack_from(self.log_map, directory_offset)[4]
+
+            self.data_end = directory_offset
+            self.directory = (
+                directory_offset + RECORD.size, payload_size // DIRECTORY_ENTRY.size)
+        else:
+            self.__scan_records()
+
+    @property
+    def append_offset(self) -> int:
+        """ This function returns the offset a writer reopening this log appends at. """
+
+        return self.data_end
+
+    def __enter__(self) -> 'EventLogReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """ This function unmaps and closes log. """
+
+        self.log_map.close()
+        self.log_file.close()
+
+    def read_events(self) -> Iterator[dict]:
+        """ This function yields every event of the log in write order. """
+
+        offset = len(LOG_MAGIC)
+        while offset + RECORD.size <= self.data_end:
+            record_type, _, _, _, payload_size = RECORD.unpack_from(self.log_map, offset)
+            if record_type == RECORD_EVENT:
+                yield self.read_event(offset)
+
+            offset += RECORD.size + payload_size
+
+    def read_match(self, match_id: int, from_turn: int = 0) -> Iterator[dict]:
+        """
+          This function yields events of a match from a turn on, in write
+          order. Only the index blocks holding events of the match are
+          searched by bisection.
+        """
+
+        for block_offset in self.__find_match_blocks(match_id):
+            entries_offset = block_offset + RECORD.size + INDEX_HEADER.size
+            entries_count = INDEX_HEADER.unpack_from(
+                self.log_map, block_offset + RECORD.size)[1]
+
+            position = self.__bisect_entries(
+                entries_offset, entries_count, (match_id, from_turn, 0))
+            while position < entries_count:
+                entry = INDEX_ENTRY.unpack_from(
+                    self.log_map, entries_offset + position * INDEX_ENTRY.size)
+                if entry[0] != match_id:
+                    break
+
+                yield self.read_event(entry[2])
+                position += 1
+
+        for entry_match_id, turn, offset in self.unindexed_entries:
+            if entry_match_id == match_id and turn >= from_turn:
+                yield self.read_event(offset)
+
+    def read_event(self, offset: int) -> dict:
+        """ This function decodes the event record at an offset. """
+
+        _, match_id, turn, timestamp, payload_size = RECORD.unpack_from(self.log_map, offset)
+        payload_offset = offset + RECORD.size
+        event = self.codec.decode(self.log_map[payload_offset:payload_offset + payload_size])
+
+        event.update({'match_id': match_id, 'turn': turn, 'timestamp': timestamp})
+        return event
+
+    def get_match_blocks(self) -> Dict[int, List[int]]:
+        """ This function returns offsets of the index blocks holding events of every match. """
+
+        if self.directory is None:
+            return {match_id: list(blocks) for match_id, blocks in self.match_blocks.items()}
+
+        match_blocks = {}
+        entries_offset, entries_count = self.directory
+        for position in range(entries_count):
+            match_id, block_offset = DIRECTORY_ENTRY.unpack_from(
+                self.log_map, entries_offset + position * DIRECTORY_ENTRY.size)
+            match_blocks.setdefault(match_id, []).append(block_offset)
+
+        return match_blocks
+
+    def __find_match_blocks(self, match_id: int) -> Iterator[int]:
+        """ This function yields offsets of the index blocks holding events of a match. """
+
+        if self.directory is None:
+            yield from self.match_blocks.get(match_id, [])
+            return
+
+        entries_offset, entries_count = self.directory
+        low, high = 0, entries_count
+        while low < high:
+            middle = (low + high) // 2
+            entry_match_id, _ = DIRECTORY_ENTRY.unpack_from(
+                self.log_map, entries_offset + middle * DIRECTORY_ENTRY.size)
+            if entry_match_id < match_id:
+                low = middle + 1
+            else:
+                high = middle
+
+        while low < entries_count:
+            entry_match_id, block_offset = DIRECTORY_ENTRY.unpack_from(
+                self.log_map, entries_offset + low * DIRECTORY_ENTRY.size)
+            if entry_match_id != match_id:
+                break
+
+            yield block_offset
+            low += 1
+
+    def __scan_records(self) -> None:
+        """
+          This function finds index blocks of a log without trailer by
+          walking record headers. A partially written last record, or a
+          directory left without trailer, ends the data of the log.
+        """
+
+        offset = len(LOG_MAGIC)
+        self.data_end = offset
+        while offset + RECORD.size <= len(self.log_map):
+            record_type, match_id, turn, _, payload_size = RECORD.unpack_from(self.log_map, offset)
+            record_end = offset + RECORD.size + payload_size
+            if record_end > len(self.log_map) or record_type not in (RECORD_EVENT, RECORD_INDEX):
+                break
+
+            if record_type == RECORD_INDEX:
+                entries_offset = offset + RECORD.size + INDEX_HEADER.size
+                for entry_match_id in sorted({
+                    entry[0] for entry in INDEX_ENTRY.iter_unpack(
+                        self.log_map[entries_offset:record_end])
+                }):
+                    self.match_blocks.setdefault(entry_match_id, []).append(offset)
+
+                self.last_index_offset = offset
+                self.unindexed_entries = []
+            else:
+                self.unindexed_entries.append((match_id, turn, offset))
+
+            offset = record_end
+            self.data_end = offset
+
+    def __bisect_entries(
+            self,
+            entries_offset: int,
+            entries_count: int,
+            key: Tuple[int, int, int]) -> int:
+        """ This function returns position of the first entry not lower than key. """
+
+        low, high = 0, entries_count
+        while low < high:
+            middle = (low + high) // 2
+            entry = INDEX_ENTRY.unpack_from(
+                self.log_map, entries_offset + middle * INDEX_ENTRY.size)
+            if entry < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+
+def print_events(log_path: str, match_id: Union[int, None] = None, from_turn: int = 0) -> None:
+    """ This function prints events of a log, or of one of its matches. """
+
+    with EventLogReader(log_path) as reader:
+        events = (
+            reader.read_events() if match_id is None
+            else reader.read_match(match_id, from_turn))
+        for event in events:
+            print(event)
+
+
+if __name__ == '__main__':
+    arguments: List[str] = sys.argv[1:]
+    if not arguments or not os.path.exists(arguments[0]):
+        print('Usage: python -m networking.event_log LOG_PATH [MATCH_ID [FROM_TURN]]')
+        sys.exit(1)
+
+    print_events(arguments[0], *(int(argument) for argument in arguments[1:3]))
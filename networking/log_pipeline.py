@@ -0,0 +1,105 @@
+import queue
+import atexit
+import logging
+import itertools
+import threading
+import logging.handlers
+from typing import Dict, Union
+
+from networking.constants import LOG_QUEUE_SIZE, REQUEST_LOG_LEVELS, REQUEST_LOG_SAMPLE_RATES
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+      This class hands log records to a bounded queue as they are.
+
+      Unlike QueueHandler, records are not formatted by the thread that
+      logs them, the writer thread formats them. Records logged while
+      the queue is full are dropped and counted instead of blocking.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped_records = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """ This function keeps records unformatted, arguments are formatted by writer. """
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """ This function queues a record, or drops it if writer is behind. """
+
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_records += 1
+
+
+_configure_lock = threading.Lock()
+_queue_handler = None
+
+
+def configure_logging(level: int = logging.INFO) -> DeferredQueueHandler:
+    """
+      This function moves handlers of the root logger to a background
+      writer thread, root logger only queues records afterwards. It can
+      be called many times, logging is only configured by the first call.
+    """
+
+    global _queue_handler
+
+    with _configure_lock:
+        if _queue_handler is None:
+            root_logger = logging.getLogger()
+            _queue_handler = DeferredQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+            listener = logging.handlers.QueueListener(
+                _queue_handler.queue, *root_logger.handlers, respect_handler_level=True)
+
+            root_logger.handlers = [_queue_handler]
+            listener.start()
+
+            # Queued records are written before the process exits
+            atexit.register(listener.stop)
+            root_logger.setLevel(level)
+
+    return _queue_handler
+
+
+class RequestLogger:
+    """
+      This class logs requests received by a server.
+
+      Every request type is logged at its own level and frequent ones
+      are sampled, only one of every sample rate requests is logged.
+      Requests that are not logged cost a dict lookup and a level check,
+      logged ones are formatted later by the writer thread, so their
+      data must not be changed once logged.
+    """
+
+    def __init__(
+            self,
+            levels: Union[Dict[str, int], None] = None,
+            sample_rates: Union[Dict[str, int], None] = None) -> None:
+        self.logger = logging.getLogger('networking.requests')
+        self.levels = REQUEST_LOG_LEVELS if levels is None else levels
+        self.sample_rates = REQUEST_LOG_SAMPLE_RATES if sample_rates is None else sample_rates
+
+        # Counting is atomic, listeners of every client share counters
+        self.sample_counters = {
+            request_type: itertools.count() for request_type in self.sample_rates
+        }
+
+    def log_request(self, client_name: str, request_type: str, decoded_data: object) -> None:
+        """ This function logs a request if its level is enabled and it is sampled. """
+
+        level = self.levels.get(request_type, logging.INFO)
+        if not self.logger.isEnabledFor(level):
+            return
+
+        sample_counter = self.sample_counters.get(request_type)
+        if sample_counter and next(sample_counter) % self.sample_rates[request_type]:
+            return
+
+        self.logger.log(
+            level, 'Received %s from %s: %s', request_type, client_name, decoded_data,
+            extra={'request_type': request_type, 'client_name': client_name})
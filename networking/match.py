@@ -0,0 +1,563 @@
+import socket
+import logging
+import threading
+from typing import Callable, List, Tuple, Union
+
+from engine.board import Board
+from engine.fleet import place_fleet
+from engine.constants import PLAYERS_PER_MATCH
+from engine.rules import get_enemy, is_valid_shot, pass_turn, resolve_attack
+from networking.decorator import thread_safe
+from networking.constants import GameStatus
+
+
+class Match:
+    """
+      This class holds the state and rules of a battleship match.
+
+      Match does not own any connection, responses and events are
+      written through the send_data_to_client function provided by
+      the server that runs it. Events for several clients are written
+      once through send_data_to_clients, which lets the server encode
+      them a single time. Spectators only receive events.
+
+      When the server keeps an event log, joins, fleet locks, attacks
+      and results are appended to it with log_event, tagged with the
+      number of shots fired so far in the match.
+
+      When the server persists state, a snapshot of the match is given
+      to save_state after every change once players left the lobby, and
+      None once it ended, so the match can be restored after a restart.
+
+      Every match owns its lock and a request is processed entirely
+      while holding it, so requests of the same match never interleave
+      and requests of different matches never wait for each other.
+    """
+
+    def __init__(
+            self,
+            match_id: int,
+            send_data_to_client: Callable[..., None],
+            send_data_to_clients: Callable[..., None],
+            log_event: Union[Callable[[int, dict], None], None] = None,
+            save_state: Union[Callable[[Union[dict, None]], None], None] = None) -> None:
+        self.match_id = match_id
+        self.send_data_to_client = send_data_to_client
+        self.send_data_to_clients = send_data_to_clients
+        self.log_event = log_event
+        self.save_state = save_state
+        self.lock = threading.RLock()
+        self.is_first_player = True
+        self.game_data = {
+            'winner': None,
+            'turn': 0,
+            'game_status': GameStatus['lobby'].name,
+            'boards': {},
+            'clients': {},
+            'subscribers': set(),
+            'spectators': set()
+        }
+
+    @thread_safe
+    def handle_request(
+            self,
+            client_name: str,
+            decoded_data: object,
+            request_id: int = None) -> bool:
+        """
+          This function processes a client message and sends its response,
+          tagged with the id of the request when client sent one. Unknown
+          requests are answered too, so clients never wait for a response.
+          It returns False if client asked to disconnect.
+        """
+
+        if 'request' in decoded_data:
+            if (
+                decoded_data['request'] == 'ship_locked'
+                and not self.can_lock_fleet(client_name)
+            ):
+                self.send_data_to_client(
+                    {'message': 'invalid_fleet'}, client_name, request_id=request_id)
+            elif decoded_data['request'] == 'ship_locked':
+                try:
+                    board = Board(place_fleet(decoded_data['fleet']))
+                except (ValueError, TypeError, KeyError):
+                    self.send_data_to_client(
+                        {'message': 'invalid_fleet'}, client_name, request_id=request_id)
+                else:
+                    self.game_data['clients'][client_name]['ship_locked'] = True
+                    self.game_data['boards'][client_name] = board
+                    self.record_event({
+                        'event': 'fleet_locked',
+                        'client_name': client_name,
+                        'fleet': decoded_data['fleet']
+                    })
+
+                    self.send_data_to_client(
+                        {'message': 'ok'}, client_name, request_id=request_id)
+            elif decoded_data['request'] == 'reset_game':
+                self.reset_game()
+                self.send_data_to_client(
+                    {'message': 'ok'}, client_name, request_id=request_id)
+                self.push_game_status(force=True)
+                self.push_turns()
+            elif decoded_data['request'] == 'subscribe':
+                self.game_data['subscribers'].add(client_name)
+                self.send_data_to_client(
+                    {'message': 'ok'}, client_name, request_id=request_id)
+
+                # Bring subscriber up to date before next changes
+                self.push_event(
+                    {'event': 'game_status', 'game_status': self.game_data['game_status']}, client_name)
+                self.push_event(
+                    {'event': 'turn', 'my_turn': self.game_data['clients'][client_name]['my_turn']}, client_name)
+            elif decoded_data['request'] == 'disconnect':
+                logging.info(f'Client disconnected: {client_name}')
+                return False
+            elif decoded_data['request'] == 'game_data':
+                # Player names are keys of clients, so they are wrapped to
+                # never be taken for the keys of another message
+                self.send_data_to_client(
+                    {'clients': self.game_data['clients']}, client_name, request_id=request_id)
+            elif decoded_data['request'] == 'game_status':
+                self.send_data_to_client(
+                    {'game_status': self.game_data['game_status']}, client_name, request_id=request_id)
+            elif decoded_data['request'] == 'winner':
+                self.send_data_to_client(
+                    {'winner': self.game_data['winner']}, client_name, request_id=request_id)
+            elif decoded_data['request'] == 'sync':
+                self.send_data_to_client(
+                    self.get_sync_data(client_name), client_name, request_id=request_id)
+            elif (
+                decoded_data['request'] == 'attack_tile'
+                and not (
+                    self.can_attack(client_name)
+                    and is_valid_shot(decoded_data.get('position')))
+            ):
+                self.send_data_to_client(
+                    {'message': 'invalid_attack'}, client_name, request_id=request_id)
+
+                # Client may have given its turn away when it sent the attack
+                self.push_event(
+                    {'event': 'turn', 'my_turn': self.game_data['clients'][client_name]['my_turn']}, client_name)
+            elif decoded_data['request'] == 'attack_tile':
+                ship_name, sunk = self.attack_enemy_tile(
+                    client_name, decoded_data['position'])
+                self.game_data['clients'][client_name]['attacked_tile'] = {
+                    'position': decoded_data['position'],
+                    'ship_name': ship_name,
+                    'sunk': sunk
+                }
+
+                self.send_data_to_client({
+                    'attacked': ship_name,
+                    'sunk': sunk,
+                    'game_over': self.game_data['winner'] == client_name
+                }, client_name, request_id=request_id)
+
+                attacked_event = {
+                    'event': 'attacked',
+                    'attacker': client_name,
+                    'position': decoded_data['position'],
+                    'ship_name': ship_name,
+                    'sunk': sunk
+                }
+                self.record_event(attacked_event)
+                if self.game_data['winner']:
+                    self.record_event({'event': 'winner', 'winner': self.game_data['winner']})
+                self.broadcast_event(attacked_event, [
+                    enemy_name
+                    for enemy_name in self.game_data['clients']
+                    if enemy_name != client_name
+                ])
+                self.push_turns()
+            else:
+                self.send_data_to_client(
+                    {'message': 'unknown_request'}, client_name, request_id=request_id)
+        else:
+            self.send_data_to_client({'message': 'ok'}, client_name, request_id=request_id)
+
+        if 'request' in decoded_data and decoded_data['request'] in (
+                'ship_locked', 'reset_game', 'attack_tile'):
+            self.persist_state()
+
+        self.push_game_status()
+        return True
+
+    @thread_safe
+    def handle_spectator_request(
+            self,
+            spectator_name: str,
+            decoded_data: object,
+            request_id: int = None) -> bool:
+        """
+          This function answers a spectator message, spectators can only
+          read game status and winner. It returns False if spectator
+          asked to disconnect.
+        """
+
+        request = decoded_data.get('request') if isinstance(decoded_data, dict) else None
+        if request == 'disconnect':
+            logging.info(f'Spectator disconnected: {spectator_name}')
+            return False
+
+        if request == 'game_status':
+            response = {'game_status': self.game_data['game_status']}
+        elif request == 'winner':
+            response = {'winner': self.game_data['winner']}
+        else:
+            response = {'message': 'ok'}
+
+        self.send_data_to_client(response, spectator_name, request_id=request_id)
+        return True
+
+    def broadcast_event(self, event: dict, client_names: List[str]) -> None:
+        """
+          This function sends an event once to every subscribed client
+          of client_names and to every spectator.
+        """
+
+        recipients = [
+            client_name
+            for client_name in client_names
+            if client_name in self.game_data['subscribers']
+        ]
+        recipients.extend(self.game_data['spectators'])
+
+        if recipients:
+            self.send_data_to_clients(event, recipients)
+
+    def persist_state(self) -> None:
+        """ This function saves a snapshot of a match past its lobby, if server persists state. """
+
+        if self.save_state and self.game_data['game_status'] != GameStatus['lobby'].name:
+            self.save_state(self.get_snapshot())
+
+    @thread_safe
+    def get_snapshot(self) -> dict:
+        """ This function returns game data worth restoring as a JSON serializable dict. """
+
+        return {
+            'winner': self.game_data['winner'],
+            'turn': self.game_data['turn'],
+            'game_status': self.game_data['game_status'],
+            'clients': {
+                client_name: {**client_data, 'attacked_tile': dict(client_data['attacked_tile'])}
+                for client_name, client_data in self.game_data['clients'].items()
+            },
+            'boards': {
+                client_name: board.get_snapshot() if board else None
+                for client_name, board in self.game_data['boards'].items()
+            }
+        }
+
+    @thread_safe
+    def restore_snapshot(self, snapshot: dict) -> None:
+        """
+          This function restores game data from a snapshot. Players are
+          not connected until they resume the match.
+        """
+
+        self.is_first_player = False
+        self.game_data['winner'] = snapshot['winner']
+        self.game_data['turn'] = snapshot['turn']
+        self.game_data['game_status'] = snapshot['game_status']
+        self.game_data['clients'] = snapshot['clients']
+        self.game_data['boards'] = {
+            client_name: Board.from_snapshot(board) if board else None
+            for client_name, board in snapshot['boards'].items()
+        }
+
+    def record_event(self, event: dict) -> None:
+        """ This function appends an event to the server event log, if any. """
+
+        if self.log_event:
+            self.log_event(self.game_data['turn'], event)
+
+    def push_event(self, event: dict, client_name: str) -> None:
+        """ This function sends an event to a client if it is subscribed. """
+
+        if client_name not in self.game_data['subscribers']:
+            return
+
+        try:
+            self.send_data_to_client(event, client_name)
+        except (socket.error, KeyError):
+            logging.info(f'Could not push event to: {client_name}')
+
+    @thread_safe
+    def push_turns(self) -> None:
+        """ This function pushes current turn to every subscribed client. """
+
+        for client_name, client_data in list(self.game_data['clients'].items()):
+            self.push_event(
+                {'event': 'turn', 'my_turn': client_data['my_turn']}, client_name)
+
+    @thread_safe
+    def push_game_status(self, force: bool = False) -> None:
+        """
+          This function updates game status and pushes it to every
+          subscribed client if it changed or push is forced.
+        """
+
+        status_changed = self.update_game_status()
+        if status_changed:
+            self.persist_state()
+
+        if not (status_changed or force):
+            return
+
+        client_names = list(self.game_data['clients'])
+        self.broadcast_event({
+            'event': 'game_status',
+            'game_status': self.game_data['game_status']
+        }, client_names)
+
+        if self.game_data['winner']:
+            self.broadcast_event(
+                {'event': 'winner', 'winner': self.game_data['winner']}, client_names)
+
+    @thread_safe
+    def update_game_status(self) -> bool:
+        """
+          This function moves game to its next status when players
+          are ready and returns if status changed.
+        """
+
+        game_status = self.game_data['game_status']
+        if (
+            game_status == GameStatus['lobby'].name
+            and len(self.game_data['clients']) == PLAYERS_PER_MATCH
+        ):
+            game_status = GameStatus['ship_lock'].name
+
+        if (
+            game_status == GameStatus['ship_lock'].name
+            and self.check_if_ships_are_locked()
+        ):
+            game_status = GameStatus['battle'].name
+
+        if (
+            game_status == GameStatus['battle'].name
+            and self.game_data['winner']
+        ):
+            game_status = GameStatus['finished'].name
+
+        status_changed = game_status != self.game_data['game_status']
+        self.game_data['game_status'] = game_status
+
+        return status_changed
+
+    @thread_safe
+    def end_game(self) -> None:
+        """ This function ends game after a player left. """
+
+        if self.game_data['game_status'] != GameStatus['player_disconnected'].name:
+            self.record_event({'event': 'ended'})
+            if self.save_state:
+                self.save_state(None)
+
+        self.is_first_player = True
+        self.game_data['clients'] = {}
+        self.game_data['winner'] = None
+        self.game_data['game_status'] = GameStatus['player_disconnected'].name
+
+    @thread_safe
+    def reset_game(self) -> None:
+        """ This function reset game data. """
+
+        self.is_first_player = True
+        for client_name in self.game_data['clients']:
+            self.game_data['clients'][client_name] = {
+                'attacked_tile': {
+                    'ship_name': None,
+                    'position': None,
+                    'sunk': False
+                },
+                'sinked_ships': 0,
+                'ship_locked': False,
+                'my_turn': self.is_first_player
+            }
+            self.is_first_player = False
+            self.game_data['boards'][client_name] = None
+
+        self.game_data['winner'] = None
+        self.game_data['game_status'] = GameStatus['ship_lock'].name
+        self.record_event({'event': 'reset'})
+
+    @thread_safe
+    def check_if_ships_are_locked(self) -> bool:
+        """ This function checks clients locked their ships. """
+        return all(
+            self.game_data['boards'][client_name] is not None
+            for client_name in self.game_data['boards'])
+
+    @thread_safe
+    def game_over(self, loser_name: str) -> None:
+        """
+          This function looks for the winner name by filtering using loser name.
+
+          Server maintain a tracking of players boards and their attacks
+          attemps, so it detects by itself when a fleet sinks.
+        """
+        self.game_data['winner'] = get_enemy(self.game_data['clients'], loser_name)
+
+    @thread_safe
+    def can_lock_fleet(self, client_name: str) -> bool:
+        """
+          This function checks if a player may lock its fleet now: game
+          is in ship lock and the player did not lock its fleet yet, so
+          a board is never replaced once battle started.
+        """
+        return (
+            self.game_data['game_status'] == GameStatus['ship_lock'].name
+            and not self.game_data['clients'][client_name]['ship_locked']
+        )
+
+    @thread_safe
+    def can_attack(self, attacker_name: str) -> bool:
+        """
+          This function checks if a player may attack now: game is in
+          battle, nobody won yet and it is the turn of the player.
+        """
+        return (
+            self.game_data['game_status'] == GameStatus['battle'].name
+            and not self.game_data['winner']
+            and self.game_data['clients'][attacker_name]['my_turn']
+        )
+
+    @thread_safe
+    def attack_enemy_tile(
+            self,
+            attacker_name: str,
+            position: Tuple[int, int]) -> Tuple[Union[str, None], bool]:
+        """
+          This function checks if position hits an enemy ship and updates turn.
+          It returns the ship hit, if any, and if that ship sank. Game is
+          over once every enemy ship sank.
+        """
+
+        clients = self.game_data['clients']
+        for client_name, my_turn in pass_turn(clients, attacker_name).items():
+            clients[client_name]['my_turn'] = my_turn
+
+        enemy_name = get_enemy(clients, attacker_name)
+        enemy_board = self.game_data['boards'].get(enemy_name)
+        if not enemy_board:
+            return None, False
+
+        self.game_data['turn'] += 1
+        ship_name, sunk, fleet_sunk = resolve_attack(enemy_board, position[0], position[1])
+        if sunk:
+            clients[enemy_name]['sinked_ships'] += 1
+        if fleet_sunk:
+            self.game_over(enemy_name)
+
+        return ship_name, sunk
+
+    @thread_safe
+    def get_sync_data(self, client_name: str) -> dict:
+        """
+          This function bundles what a client needs every frame: its turn,
+          last tile attacked by its enemy, game status and winner.
+        """
+
+        enemy_attacked_tile = next(
+            (
+                client_data['attacked_tile']
+                for enemy_name, client_data in self.game_data['clients'].items()
+                if enemy_name != client_name
+            ), {'ship_name': None, 'position': None, 'sunk': False})
+
+        return {
+            'my_turn': self.game_data['clients'][client_name]['my_turn'],
+            'attacked_tile': enemy_attacked_tile,
+            'game_status': self.game_data['game_status'],
+            'winner': self.game_data['winner']
+        }
+
+    @thread_safe
+    def get_connected_clients(self) -> List[str]:
+        """ This function returns connected clients. """
+        return list(self.game_data['clients'])
+
+    @thread_safe
+    def is_waiting_for_players(self) -> bool:
+        """ This function checks if match lobby still has free slots. """
+        return (
+            self.game_data['game_status'] == GameStatus['lobby'].name
+            and len(self.game_data['clients']) < PLAYERS_PER_MATCH
+        )
+
+    @thread_safe
+    def can_join(self, client_name: str) -> bool:
+        """ This function checks if a client can join this match lobby. """
+        return (
+            self.is_waiting_for_players()
+            and client_name not in self.game_data['clients']
+        )
+
+    @thread_safe
+    def add_client(self, client_name: str, subscribed: bool = False) -> None:
+        """ This function adds a client to game_data. """
+
+        self.game_data['clients'][client_name] = {
+            'attacked_tile': {
+                'ship_name': None,
+                'position': None,
+                'sunk': False
+            },
+            'sinked_ships': 0,
+            'ship_locked': False,
+            'my_turn': self.is_first_player
+        }
+        self.game_data['boards'][client_name] = None
+        self.is_first_player = False
+
+        if subscribed:
+            self.game_data['subscribers'].add(client_name)
+
+        self.record_event({'event': 'joined', 'client_name': client_name})
+
+    @thread_safe
+    def add_spectator(self, spectator_name: str) -> bool:
+        """
+          This function adds a spectator and brings it up to date. It
+          returns False if name is already used in this match.
+        """
+
+        if (
+            spectator_name in self.game_data['clients']
+            or spectator_name in self.game_data['spectators']
+        ):
+            return False
+
+        self.game_data['spectators'].add(spectator_name)
+        self.send_data_to_clients(
+            {'event': 'game_status', 'game_status': self.game_data['game_status']},
+            [spectator_name])
+        if self.game_data['winner']:
+            self.send_data_to_clients(
+                {'event': 'winner', 'winner': self.game_data['winner']}, [spectator_name])
+
+        return True
+
+    @thread_safe
+    def remove_spectator(self, spectator_name: str) -> None:
+        """ This function removes a spectator. """
+        self.game_data['spectators'].discard(spectator_name)
+
+    @thread_safe
+    def get_spectators(self) -> List[str]:
+        """ This function returns spectators of this match. """
+        return list(self.game_data['spectators'])
+
+    @thread_safe
+    def remove_client(self, client_name: str) -> None:
+        """ This function removes client from game_data. """
+
+        if self.game_data['clients'].pop(client_name, None):
+            self.record_event({'event': 'left', 'client_name': client_name})
+
+        self.game_data['subscribers'].discard(client_name)
+        self.game_data['boards'].pop(client_name, None)
@@ -0,0 +1,112 @@
+import time
+import heapq
+import itertools
+import threading
+from typing import Hashable, List, Tuple, Union
+
+from networking.decorator import thread_safe
+
+
+class Matchmaker:
+    """
+      This class queues players waiting for an opponent and pairs
+      them in batches.
+
+      Players are paired first come, first served inside their rating
+      band. Every band is a heap ordered by enqueue time, removed
+      players are only forgotten and skipped when they reach the top
+      of the heap, so enqueue, remove and pair are O(log n).
+    """
+
+    def __init__(self, band_width: Union[int, None] = None) -> None:
+        self.band_width = band_width
+        self.lock = threading.RLock()
+        self.sequence = itertools.count()
+        self.queues = {}
+        self.band_sizes = {}
+        self.entries = {}
+        self.metrics = {
+            'paired_players': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0
+        }
+
+    @thread_safe
+    def enqueue(
+            self,
+            player: Hashable,
+            rating: Union[int, None] = None,
+            enqueued_at: Union[float, None] = None) -> None:
+        """ This function adds a player to its rating band queue. """
+
+        if player in self.entries:
+            return
+
+        band = self.__rating_band(rating)
+        entry = (enqueued_at or time.monotonic(), next(self.sequence), player, rating)
+
+        self.entries[player] = entry
+        heapq.heappush(self.queues.setdefault(band, []), entry)
+        self.band_sizes[band] = self.band_sizes.get(band, 0) + 1
+
+    @thread_safe
+    def remove(self, player: Hashable) -> None:
+        """ This function removes a player that left before being paired. """
+
+        entry = self.entries.pop(player, None)
+        if entry:
+            self.band_sizes[self.__rating_band(entry[3])] -= 1
+
+    @thread_safe
+    def pair_players(self) -> List[Tuple[Hashable, Hashable]]:
+        """ This function pairs every player that has an opponent in its band. """
+
+        now = time.monotonic()
+        pairs = []
+
+        for band, queue in self.queues.items():
+            while self.band_sizes[band] >= 2:
+                first = self.__pop_entry(band, queue)
+                second = self.__pop_entry(band, queue)
+                pairs.append((first[2], second[2]))
+
+                for entry in (first, second):
+                    wait_time = now - entry[0]
+                    self.metrics['paired_players'] += 1
+                    self.metrics['total_wait_time'] += wait_time
+                    self.metrics['max_wait_time'] = max(
+                        self.metrics['max_wait_time'], wait_time)
+
+        return pairs
+
+    @thread_safe
+    def get_metrics(self) -> dict:
+        """ This function returns queue size and wait times of paired players. """
+
+        paired_players = self.metrics['paired_players']
+        return {
+            'queued_players': len(self.entries),
+            'paired_players': paired_players,
+            'mean_wait_time': (
+                self.metrics['total_wait_time'] / paired_players
+                if paired_players else 0.0),
+            'max_wait_time': self.metrics['max_wait_time']
+        }
+
+    def __pop_entry(self, band: Union[int, None], queue: list) -> tuple:
+        """ This function pops oldest live entry of a band, skipping removed ones. """
+
+        while True:
+            entry = heapq.heappop(queue)
+            if self.entries.get(entry[2]) is entry:
+                del self.entries[entry[2]]
+                self.band_sizes[band] -= 1
+                return entry
+
+    def __rating_band(self, rating: Union[int, None]) -> Union[int, None]:
+        """ This function maps a rating to its band, unrated players share a band. """
+
+        if rating is None or not self.band_width:
+            return None
+
+        return int(rating // self.band_width)
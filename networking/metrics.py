@@ -0,0 +1,184 @@
+import ipaddress
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Union
+
+from networking.decorator import thread_safe
+
+
+# Latencies are recorded in microseconds into log-linear buckets: values
+# under SUB_BUCKETS have a bucket each, above that every power of two is
+# split into SUB_BUCKETS buckets, so relative error stays under 1/8
+SUB_BUCKETS = 8
+SUB_BUCKET_BITS = 3
+MAX_LATENCY = 60 * 1000 * 1000
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def bucket_index(value: int) -> int:
+    """ This function returns the histogram bucket of a value. """
+
+    if value < SUB_BUCKETS:
+        return value
+
+    exponent = value.bit_length() - SUB_BUCKET_BITS - 1
+    return (exponent + 1) * SUB_BUCKETS + (value >> exponent) - SUB_BUCKETS
+
+
+def bucket_upper_bound(index: int) -> int:
+    """ This function returns the highest value of a histogram bucket. """
+
+    if index < SUB_BUCKETS:
+        return index
+
+    exponent = index // SUB_BUCKETS - 1
+    return (((index % SUB_BUCKETS + SUB_BUCKETS) + 1) << exponent) - 1
+
+
+def is_loopback(address: object) -> bool:
+    """ This function checks if a peer address, as given by accept, is local. """
+
+    try:
+        return ipaddress.ip_address(address[0]).is_loopback
+    except (TypeError, ValueError, IndexError):
+        return False
+
+
+class LatencyHistogram:
+    """
+      This class counts latencies in fixed log-linear buckets, so
+      recording is a couple of integer operations and memory does not
+      grow with the number of samples.
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * (bucket_index(MAX_LATENCY) + 1)
+        self.total_count = 0
+        self.total_latency = 0
+        self.max_latency = 0
+
+    def record(self, latency: int) -> None:
+        """ This function records a latency in microseconds. """
+
+        latency = min(latency, MAX_LATENCY)
+        self.counts[bucket_index(latency)] += 1
+        self.total_count += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def get_percentile(self, percentile: float) -> int:
+        """ This function returns the upper bound of the bucket holding a percentile. """
+
+        threshold = self.total_count * percentile / 100
+        count = 0
+        for index, bucket_count in enumerate(self.counts):
+            count += bucket_count
+            if bucket_count and count >= threshold:
+                return min(bucket_upper_bound(index), self.max_latency)
+
+        return 0
+
+    def get_summary(self) -> dict:
+        """ This function returns count, mean, max and percentiles in microseconds. """
+
+        summary = {
+            'count': self.total_count,
+            'mean': self.total_latency / self.total_count if self.total_count else 0,
+            'max': self.max_latency
+        }
+        for percentile in PERCENTILES:
+            summary[f'p{percentile}'] = self.get_percentile(percentile)
+
+        return summary
+
+
+class MetricsRegistry:
+    """
+      This class keeps server metrics: count and latency of every request
+      type, bytes received and sent, and gauges read when metrics are
+      requested like connected clients or running matches.
+    """
+
+    def __init__(self, gauges: Union[Dict[str, Callable[[], int]], None] = None) -> None:
+        self.lock = threading.RLock()
+        self.gauges = gauges or {}
+        self.histograms = {}
+        self.bytes_received = 0
+        self.bytes_sent = 0
+
+    @thread_safe
+    def record_request(self, request_type: str, latency: float, frame_size: int) -> None:
+        """ This function records a request, its latency in seconds and its frame size. """
+
+        histogram = self.histograms.get(request_type)
+        if histogram is None:
+            histogram = self.histograms[request_type] = LatencyHistogram()
+
+        histogram.record(int(latency * 1000000))
+        self.bytes_received += frame_size
+
+    @thread_safe
+    def record_bytes_sent(self, frame_size: int) -> None:
+        """ This function records a frame sent to a client. """
+        self.bytes_sent += frame_size
+
+    @thread_safe
+    def get_metrics(self) -> dict:
+        """ This function returns every metric as a JSON serializable dict. """
+
+        return {
+            'requests': {
+                request_type: histogram.get_summary()
+                for request_type, histogram in self.histograms.items()
+            },
+            'bytes_received': self.bytes_received,
+            'bytes_sent': self.bytes_sent,
+            **{gauge_name: gauge() for gauge_name, gauge in self.gauges.items()}
+        }
+
+    def render_text(self) -> str:
+        """ This function renders metrics as text, one metric per line. """
+
+        metrics = self.get_metrics()
+        lines: List[str] = []
+        for request_type, summary in metrics.pop('requests').items():
+            for name, value in summary.items():
+                lines.append(f'request_latency_us{{type="{request_type}",stat="{name}"}} {value}')
+
+        for name, value in metrics.items():
+            lines.append(f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsEndpoint:
+    """
+      This class serves metrics as plain text over HTTP on a local port,
+      every GET request is answered with MetricsRegistry.render_text.
+    """
+
+    def __init__(self, metrics: MetricsRegistry, host_address: str, host_port: int) -> None:
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = metrics.render_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.http_server = ThreadingHTTPServer((host_address, host_port), MetricsHandler)
+        self.http_server.daemon_threads = True
+
+    def start(self) -> None:
+        """ This function serves metrics on a background thread. """
+        threading.Thread(target=self.http_server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        """ This function stops serving metrics. """
+
+        self.http_server.shutdown()
+        self.http_server.server_close()
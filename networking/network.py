@@ -1,22 +1,490 @@
 import json
+import socket
+import struct
+from typing import Union, List, Tuple
+
+from networking.constants import (
+    BUFFER_SIZE, MAX_FRAME_SIZE, GameStatus)
+from engine.constants import SHIPS_NAMES
+
+
+# Every frame starts with its payload length as an unsigned 32-bit integer
+FRAME_HEADER = struct.Struct('!I')
+
+# Pipelined connections start every payload with the id of the request
+# it answers, events pushed by server use EVENT_REQUEST_ID
+REQUEST_ID = struct.Struct('!I')
+EVENT_REQUEST_ID = 0
+
+
+class ProtocolError(ValueError):
+    """
+      This class is raised when a peer sends frames that break the
+      protocol, so its connection has to be closed by this side.
+    """
+
+
+class JsonCodec:
+    """ This class encodes messages as JSON text. """
+
+    name = 'json'
+
+    def encode(self, data: object) -> bytes:
+        """ This function encodes a message into bytes. """
+        return json.dumps(data).encode('utf-8')
+
+    def decode(self, payload: Union[bytes, memoryview]) -> object:
+        """ This function decodes bytes into a message. """
+        return json.loads(str(payload, 'utf-8'))
+
+
+class BinaryCodec:
+    """
+      This class encodes messages as a one byte opcode followed by
+      struct-packed fields.
+
+      Only the small messages sent on every frame have a compact form,
+      anything else is carried as JSON after the OP_JSON opcode, so every
+      message can be sent with this codec.
+    """
+
+    name = 'binary'
+
+    OP_JSON = 0
+    OP_OK = 1
+    OP_GAME_STATUS = 2
+    OP_WINNER = 3
+    OP_ATTACKED = 4
+    OP_ATTACK_TILE = 5
+
+    # Events pushed by server to subscribed clients
+    EV_GAME_STATUS = 6
+    EV_TURN = 7
+    EV_ATTACKED = 8
+    EV_WINNER = 9
+
+    OP_SYNC = 10
+
+    # Fleet is a list of ship, x, y and orientation placements
+    OP_SHIP_LOCKED = 11
+    PLACEMENT = struct.Struct('!BBB?')
+    SYNC_HAS_TURN = 1
+    SYNC_HAS_ATTACK = 2
+    SYNC_HAS_WINNER = 4
+    SYNC_SUNK = 8
+
+    # Attack results carry a flags byte
+    ATTACK_SUNK = 1
+    ATTACK_GAME_OVER = 2
+
+    # Requests without arguments are a single opcode byte
+    REQUEST_OPCODES = {
+        'disconnect': 16,
+        'game_data': 17,
+        'game_status': 18,
+        'winner': 19,
+        'reset_game': 20,
+        'subscribe': 22,
+        'sync': 23,
+        'metrics': 24
+    }
+    REQUEST_NAMES = {opcode: name for name, opcode in REQUEST_OPCODES.items()}
+
+    NO_SHIP = 0xFF
+    POSITION = struct.Struct('!BB')
+
+    def __init__(self) -> None:
+        self.json_codec = JsonCodec()
+
+    def encode(self, data: object) -> bytes:
+        """ This function encodes a message into bytes. """
+
+        if isinstance(data, dict):
+            compact = self.__encode_compact(data)
+            if compact is not None:
+                return compact
+
+        return bytes((self.OP_JSON,)) + self.json_codec.encode(data)
+
+    def decode(self, payload: Union[bytes, memoryview]) -> object:
+        """ This function decodes bytes into a message. """
+
+        opcode = payload[0]
+        if opcode == self.OP_JSON:
+            return self.json_codec.decode(payload[1:])
+        if opcode in self.REQUEST_NAMES:
+            return {'request': self.REQUEST_NAMES[opcode]}
+        if opcode == self.OP_OK:
+            return {'message': 'ok'}
+        if opcode == self.OP_GAME_STATUS:
+            return {'game_status': GameStatus(payload[1]).name}
+        if opcode == self.OP_WINNER:
+            winner = str(payload[2:], 'utf-8') if payload[1] else None
+            return {'winner': winner}
+        if opcode == self.OP_ATTACKED:
+            return {
+                'attacked': self.__decode_ship(payload[1]),
+                'sunk': bool(payload[2] & self.ATTACK_SUNK),
+                'game_over': bool(payload[2] & self.ATTACK_GAME_OVER)
+            }
+        if opcode == self.OP_ATTACK_TILE:
+            position = list(self.POSITION.unpack_from(payload, 1))
+            return {'request': 'attack_tile', 'position': position}
+        if opcode == self.EV_GAME_STATUS:
+            return {'event': 'game_status', 'game_status': GameStatus(payload[1]).name}
+        if opcode == self.EV_TURN:
+            return {'event': 'turn', 'my_turn': bool(payload[1])}
+        if opcode == self.EV_ATTACKED:
+            position = list(self.POSITION.unpack_from(payload, 1))
+            return {
+                'event': 'attacked',
+                'attacker': str(payload[5:], 'utf-8'),
+                'position': position,
+                'ship_name': self.__decode_ship(payload[3]),
+                'sunk': bool(payload[4] & self.ATTACK_SUNK)
+            }
+        if opcode == self.EV_WINNER:
+            return {'event': 'winner', 'winner': str(payload[1:], 'utf-8')}
+        if opcode == self.OP_SYNC:
+            return self.__decode_sync(payload)
+        if opcode == self.OP_SHIP_LOCKED:
+            fleet = [
+                [SHIPS_NAMES[ship_byte], x, y, is_vertical]
+                for ship_byte, x, y, is_vertical in self.PLACEMENT.iter_unpack(payload[1:])
+            ]
+            return {'request': 'ship_locked', 'fleet': fleet}
+
+        raise ValueError(f'Unknown opcode: {opcode}')
+
+    def __encode_compact(self, data: dict) -> Union[bytes, None]:
+        """
+          This function returns the compact form of a message or None
+          if message has no compact form.
+        """
+
+        keys = data.keys()
+        if (
+            keys == {'request'}
+            and isinstance(data['request'], str)
+            and data['request'] in self.REQUEST_OPCODES
+        ):
+            return bytes((self.REQUEST_OPCODES[data['request']],))
+
+        if keys == {'message'} and data['message'] == 'ok':
+            return bytes((self.OP_OK,))
+
+        if keys == {'game_status'} and self.__is_game_status(data['game_status']):
+            return bytes((self.OP_GAME_STATUS, GameStatus[data['game_status']].value))
+
+        if keys == {'winner'} and (data['winner'] is None or isinstance(data['winner'], str)):
+            if data['winner'] is None:
+                return bytes((self.OP_WINNER, 0))
+            return bytes((self.OP_WINNER, 1)) + data['winner'].encode('utf-8')
+
+        if (
+            keys == {'attacked', 'sunk', 'game_over'}
+            and (data['attacked'] is None or data['attacked'] in SHIPS_NAMES)
+        ):
+            flags = 0
+            if data['sunk']:
+                flags |= self.ATTACK_SUNK
+            if data['game_over']:
+                flags |= self.ATTACK_GAME_OVER
+
+            return bytes((self.OP_ATTACKED, self.__encode_ship(data['attacked']), flags))
+
+        if (
+            keys == {'request', 'position'}
+            and data['request'] == 'attack_tile'
+            and self.__is_byte_position(data['position'])
+        ):
+            return bytes((self.OP_ATTACK_TILE,)) + self.POSITION.pack(*data['position'])
+
+        if (
+            keys == {'request', 'fleet'}
+            and data['request'] == 'ship_locked'
+            and self.__is_byte_fleet(data['fleet'])
+        ):
+            return bytes((self.OP_SHIP_LOCKED,)) + b''.join(
+                self.PLACEMENT.pack(SHIPS_NAMES.index(ship_name), x, y, bool(is_vertical))
+                for ship_name, x, y, is_vertical in data['fleet'])
+
+        if 'event' in keys:
+            return self.__encode_event(data)
+
+        if keys == {'my_turn', 'attacked_tile', 'game_status', 'winner'}:
+            return self.__encode_sync(data)
+
+        return None
+
+    def __encode_sync(self, data: dict) -> Union[bytes, None]:
+        """
+          This function packs a sync response as flags, game status,
+          attacked position and ship, followed by winner name.
+        """
+
+        attacked_tile = data['attacked_tile']
+        if (
+            not self.__is_game_status(data['game_status'])
+            or not isinstance(attacked_tile, dict)
+            or attacked_tile.keys() != {'position', 'ship_name', 'sunk'}
+            or not (attacked_tile['position'] is None
+                    or self.__is_byte_position(attacked_tile['position']))
+            or not (attacked_tile['ship_name'] is None
+                    or attacked_tile['ship_name'] in SHIPS_NAMES)
+            or not (data['winner'] is None or isinstance(data['winner'], str))
+        ):
+            return None
+
+        flags = 0
+        position = (0, 0)
+        if data['my_turn']:
+            flags |= self.SYNC_HAS_TURN
+        if attacked_tile['position'] is not None:
+            flags |= self.SYNC_HAS_ATTACK
+            position = attacked_tile['position']
+        if data['winner'] is not None:
+            flags |= self.SYNC_HAS_WINNER
+        if attacked_tile['sunk']:
+            flags |= self.SYNC_SUNK
+
+        return (bytes((self.OP_SYNC, flags, GameStatus[data['game_status']].value))
+                + self.POSITION.pack(*position)
+                + bytes((self.__encode_ship(attacked_tile['ship_name']),))
+                + (data['winner'] or '').encode('utf-8'))
+
+    def __decode_sync(self, payload: Union[bytes, memoryview]) -> dict:
+        """ This function unpacks a sync response. """
+
+        flags = payload[1]
+        position = None
+        if flags & self.SYNC_HAS_ATTACK:
+            position = list(self.POSITION.unpack_from(payload, 3))
+
+        return {
+            'my_turn': bool(flags & self.SYNC_HAS_TURN),
+            'attacked_tile': {
+                'position': position,
+                'ship_name': self.__decode_ship(payload[5]),
+                'sunk': bool(flags & self.SYNC_SUNK)
+            },
+            'game_status': GameStatus(payload[2]).name,
+            'winner': str(payload[6:], 'utf-8') if flags & self.SYNC_HAS_WINNER else None
+        }
+
+    def __encode_event(self, data: dict) -> Union[bytes, None]:
+        """ This function returns the compact form of a pushed event. """
+
+        keys = data.keys()
+        event = data['event']
+
+        if (
+            event == 'game_status' and keys == {'event', 'game_status'}
+            and self.__is_game_status(data['game_status'])
+        ):
+            return bytes((self.EV_GAME_STATUS, GameStatus[data['game_status']].value))
+
+        if event == 'turn' and keys == {'event', 'my_turn'}:
+            return bytes((self.EV_TURN, int(bool(data['my_turn']))))
+
+        if (
+            event == 'attacked'
+            and keys == {'event', 'attacker', 'position', 'ship_name', 'sunk'}
+            and isinstance(data['attacker'], str)
+            and self.__is_byte_position(data['position'])
+            and (data['ship_name'] is None or data['ship_name'] in SHIPS_NAMES)
+        ):
+            return (bytes((self.EV_ATTACKED,))
+                    + self.POSITION.pack(*data['position'])
+                    + bytes((self.__encode_ship(data['ship_name']),
+                             self.ATTACK_SUNK if data['sunk'] else 0))
+                    + data['attacker'].encode('utf-8'))
+
+        if (
+            event == 'winner' and keys == {'event', 'winner'}
+            and isinstance(data['winner'], str)
+        ):
+            return bytes((self.EV_WINNER,)) + data['winner'].encode('utf-8')
+
+        return None
+
+    def __encode_ship(self, ship_name: Union[str, None]) -> int:
+        """ This function maps a ship name to its byte. """
+        return self.NO_SHIP if ship_name is None else SHIPS_NAMES.index(ship_name)
+
+    def __decode_ship(self, ship_byte: int) -> Union[str, None]:
+        """ This function maps a byte to its ship name. """
+        return None if ship_byte == self.NO_SHIP else SHIPS_NAMES[ship_byte]
+
+    def __is_game_status(self, game_status: object) -> bool:
+        """ This function checks if a value is the name of a game status. """
+        return isinstance(game_status, str) and game_status in GameStatus.__members__
+
+    def __is_byte_fleet(self, fleet: object) -> bool:
+        """ This function checks if every placement of a fleet fits in bytes. """
+        return (
+            isinstance(fleet, (list, tuple))
+            and all(
+                isinstance(placement, (list, tuple))
+                and len(placement) == 4
+                and placement[0] in SHIPS_NAMES
+                and self.__is_byte_position(placement[1:3])
+                for placement in fleet)
+        )
+
+    def __is_byte_position(self, position: object) -> bool:
+        """ This function checks if position fits in two unsigned bytes. """
+        return (
+            isinstance(position, (list, tuple))
+            and len(position) == 2
+            and all(type(value) == int and 0 <= value <= 0xFF for value in position)
+        )
+
+
+CODECS = {
+    JsonCodec.name: JsonCodec(),
+    BinaryCodec.name: BinaryCodec()
+}
+DEFAULT_CODEC = CODECS[JsonCodec.name]
+
+
+def negotiate_codec(offered_codecs: List[str]) -> Union[JsonCodec, BinaryCodec]:
+    """
+      This function picks the first offered codec known by this side,
+      falling back to JSON.
+    """
+
+    for codec_name in offered_codecs:
+        if codec_name in CODECS:
+            return CODECS[codec_name]
+
+    return DEFAULT_CODEC
 
 
 class Network:
     """ This class handles networking common logic. """
 
-    def create_datagram(self, buffer_size: int, data: object) -> bytes:
-        """ This function creates a datagram of fixed length. """
+    def create_datagram(
+            self,
+            data: object,
+            codec: Union[JsonCodec, BinaryCodec] = DEFAULT_CODEC,
+            request_id: int = None) -> bytes:
+        """
+          This function creates a length-prefixed frame, its payload
+          starts with request id on pipelined connections.
+        """
+
+        payload = codec.encode(data)
+        if request_id is not None:
+            payload = REQUEST_ID.pack(request_id) + payload
+
+        return FRAME_HEADER.pack(len(payload)) + payload
+
+    def decode_data(
+            self,
+            data: Union[bytes, memoryview],
+            codec: Union[JsonCodec, BinaryCodec] = DEFAULT_CODEC) -> object:
+        """ This function decode a frame payload. """
+        return codec.decode(data)
+
+    def split_request_id(
+            self,
+            data: Union[bytes, memoryview]) -> Tuple[int, Union[bytes, memoryview]]:
+        """ This function splits a pipelined frame payload into request id and message. """
+
+        if len(data) < REQUEST_ID.size:
+            raise ValueError('Frame too short for a request id')
+
+        (request_id,) = REQUEST_ID.unpack_from(data)
+        return request_id, data[REQUEST_ID.size:]
+
+
+class FrameReader:
+    """
+      This class reads length-prefixed frames from a stream socket.
+
+      Bytes are received straight into a preallocated buffer with
+      recv_into, and frames are returned as memoryview slices of it,
+      so no bytes are copied between socket and decoder. A frame split
+      across several recv calls is reassembled and several frames
+      received at once are returned one by one.
+
+      A returned frame is only valid until next read_frame call, which
+      may reuse its bytes.
+    """
+
+    def __init__(self, stream_socket: socket.socket, buffer_size: int = BUFFER_SIZE) -> None:
+        self.stream_socket = stream_socket
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+
+        # Received bytes not read yet are buffer[start:end]
+        self.start = 0
+        self.end = 0
+
+    def read_frame(self) -> Union[memoryview, None]:
+        """
+          This function returns the next frame payload, blocking
+          until it is complete. None is returned if peer closed
+          the connection.
+        """
+
+        while True:
+            frame = self.next_buffered_frame()
+            if frame is not None:
+                return frame
+
+            if self.end == len(self.buffer):
+                self.__make_room()
+
+            received = self.stream_socket.recv_into(self.view[self.end:])
+            if not received:
+                return None
+
+            self.end += received
+
+    def next_buffered_frame(self) -> Union[memoryview, None]:
+        """ This function pops a complete frame from buffer if there is one. """
+
+        if self.end - self.start < FRAME_HEADER.size:
+            return None
+
+        (frame_size,) = FRAME_HEADER.unpack_from(self.buffer, self.start)
+        if frame_size > MAX_FRAME_SIZE:
+            raise ProtocolError(f'Frame too large: {frame_size} bytes')
+
+        frame_start = self.start + FRAME_HEADER.size
+        frame_end = frame_start + frame_size
+        if self.end < frame_end:
+            return None
+
+        self.start = frame_end
+        if self.start == self.end:
+            self.start = self.end = 0
 
-        message = json.dumps(data)
-        header_size = abs(buffer_size - len(message))
-        datagram = f'{"":*>{header_size}}' + message
+        return self.view[frame_start:frame_end]
 
-        return bytes(datagram, 'utf-8')
+    def __make_room(self) -> None:
+        """
+          This function makes room at the end of a full buffer by moving
+          unread bytes to its front, or by replacing it with a larger one
+          if the frame being received does not fit.
+        """
 
-    def decode_data(self, data: bytes) -> object:
-        """ This function decode data received from server. """
+        unread_size = self.end - self.start
+        needed_size = FRAME_HEADER.size
+        if unread_size >= FRAME_HEADER.size:
+            (frame_size,) = FRAME_HEADER.unpack_from(self.buffer, self.start)
+            needed_size += frame_size
 
-        decoded_data = data.decode('utf-8')
-        cleaned_data = decoded_data.replace('*', '')
+        if needed_size > len(self.buffer):
+            # Frames returned before may still be in use, so old buffer is not resized
+            buffer = bytearray(max(needed_size, 2 * len(self.buffer)))
+            buffer[:unread_size] = self.view[self.start:self.end]
+            self.buffer = buffer
+            self.view = memoryview(buffer)
+        else:
+            self.buffer[:unread_size] = self.view[self.start:self.end]
 
-        return json.loads(cleaned_data)
+        self.start = 0
+        self.end = unread_size
@@ -1,12 +1,13 @@
-import enum
+import queue
 import socket
 import logging
-from typing import List, Tuple
-from threading import Thread
+from threading import Thread, Event, BoundedSemaphore
+from typing import Union
 
-from networking.network import Network
-from networking.decorator import thread_safe
-from networking.constants import CONN_LIMIT, BUFFER_SIZE, SHIPS_NAMES
+from networking.base_server import BaseServer
+from networking.network import FrameReader
+from networking.constants import (
+    BUFFER_SIZE, CONN_LIMIT, HANDSHAKE_TIMEOUT, MATCHMAKING_INTERVAL, SEND_QUEUE_SIZE, SEND_DRAIN_TIMEOUT)
 
 
 logging.basicConfig(format='%(asctime)s - %(message)s',
@@ -14,32 +15,35 @@ logging.basicConfig(format='%(asctime)s - %(message)s',
 logging.root.setLevel(logging.NOTSET)
 
 
-class GameStatus(enum.Enum):
-    lobby = 1
-    ship_lock = 2
-    battle = 3
-    finished = 4
-    player_disconnected = 5
+class Server(BaseServer):
+    """
+      This class represents server instance.
 
+      Every client has a listener thread that reads its requests and a
+      writer thread that sends frames from a bounded queue, so a slow
+      client only fills its own queue and is disconnected once it is full
+      instead of delaying other clients of its match.
+    """
 
-class Server(Network):
-    """ This class represents server instance. """
-
-    def __init__(self, host_address: str, host_port: int) -> None:
-        self.is_first_player = True
+    def __init__(
+            self,
+            host_address: str,
+            host_port: int,
+            event_log_path: Union[str, None] = None,
+            state_path: Union[str, None] = None,
+            metrics_port: Union[int, None] = None) -> None:
+        super().__init__(host_address, host_port, event_log_path, state_path, metrics_port)
         self.server_socket = None
-        self.host_address = host_address
-        self.host_port = host_port
-        self.game_data = {
-            'winner': None,
-            'game_status': GameStatus['lobby'].name,
-            'game_grid': {},
-            'clients': {},
-            'sockets': {}
-        }
+        self.stop_event = Event()
+        self.connection_slots = BoundedSemaphore(CONN_LIMIT)
 
     def start_server(self) -> None:
-        """ This function creates a server socket and start a thread for listening. """
+        """
+          This function recovers persisted matches, creates a server socket
+          and start threads for listening and matchmaking.
+        """
+
+        self.start_services()
 
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.bind((self.host_address, self.host_port))
@@ -48,249 +52,210 @@ class Server(Network):
         server_thread = Thread(target=self.server_lobby)
         server_thread.start()
 
+        matchmaking_thread = Thread(target=self.matchmaking_lobby, daemon=True)
+        matchmaking_thread.start()
+
     def stop_server(self) -> None:
         """ This function stops current server. """
 
-        self.end_game()
-        self.server_socket.close()
+        self.stop_event.set()
+        self.end_matches()
+
+        # Shutdown wakes up server lobby blocked on accept
+        self.__close_socket(self.server_socket)
+        self.close_services()
 
     def server_lobby(self) -> None:
-        """ This function handles server lobby, waiting for every player is connected. """
+        """
+          This function handles server lobby, it blocks on accept until a
+          client arrives. Clients that arrive while every slot is taken
+          are rejected right away, so they never get a listener thread
+          and lobby never waits for free slots.
+        """
 
         logging.info('Server started!')
         try:
             while True:
-                if len(self.game_data['clients']) < CONN_LIMIT:
-                    client, address = self.server_socket.accept()
+                client, address = self.server_socket.accept()
+
+                # Events are small frames sent one after another, Nagle would hold them
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
-                    client_thread = Thread(
-                        target=self.client_listener, args=(client, address))
-                    client_thread.start()
+                if not self.connection_slots.acquire(blocking=False):
+                    logging.info(f'Server full, rejected client from IP: "{address}"')
+                    self.reject_client(client)
+                    continue
+
+                client_thread = Thread(
+                    target=self.client_listener, args=(client, address))
+                client_thread.start()
         except socket.error:
             logging.info('Server stopped.')
 
+    def matchmaking_lobby(self) -> None:
+        """ This function runs matchmaking every interval until server stops. """
+
+        while not self.stop_event.wait(MATCHMAKING_INTERVAL):
+            self.run_matchmaking()
+
     def client_listener(self, client_socket: socket.socket, client_ip: str):
-        """ This function listens to clients messages and processes them. """
+        """
+          This function reads the handshake of an admitted client and
+          serves it. Clients waiting for their handshake hold the slot
+          taken by lobby too, so they are bounded by CONN_LIMIT and
+          HANDSHAKE_TIMEOUT.
+        """
 
-        socket_disconnected = False
+        try:
+            frame_reader = FrameReader(client_socket)
+            settings = self.accept_handshake(client_socket, frame_reader, client_ip)
+            if settings:
+                self.serve_client(client_socket, frame_reader, settings, client_ip)
+        finally:
+            self.connection_slots.release()
+
+    def accept_handshake(
+            self,
+            client_socket: socket.socket,
+            frame_reader: FrameReader,
+            client_ip: str) -> Union[dict, None]:
+        """
+          This function returns the connection settings of an accepted
+          handshake. Rejected clients are told why, and clients whose
+          handshake is late or broken are closed.
+        """
 
-        data = client_socket.recv(BUFFER_SIZE)
-        client_name = self.decode_data(data)
+        try:
+            client_socket.settimeout(HANDSHAKE_TIMEOUT)
+            data = frame_reader.read_frame()
+            client_socket.settimeout(None)
+
+            if data is None:
+                self.__close_socket(client_socket)
+                return None
+
+            settings, reject_reason = self.read_handshake(data, client_ip)
+        except Exception as error:
+            logging.info(f'No valid handshake from IP: "{client_ip}": {error!r}')
+            self.__close_socket(client_socket)
+            return None
+
+        if reject_reason:
+            self.reject_client(client_socket, reject_reason)
+            return None
+
+        return settings
+
+    def serve_client(
+            self,
+            client_socket: socket.socket,
+            frame_reader: FrameReader,
+            settings: dict,
+            client_ip: str) -> None:
+        """
+          This function processes requests of a client until it leaves.
+          Its connection, match and socket are released however it
+          leaves, frames that can not be decoded or handled close it.
+        """
 
-        self.__add_client_to_server(client_name, client_socket)
-        self.send_data_to_client('Connected', client_name)
+        client_name = settings['client_name']
+        connection = None
+        try:
+            connection = self.open_connection(settings, client_ip, {
+                'socket': client_socket,
+                'send_queue': queue.Queue(SEND_QUEUE_SIZE)
+            })
+            writer_thread = Thread(target=self.client_writer, args=(connection,), daemon=True)
+            writer_thread.start()
 
-        logging.info(
-            f'Client "{client_name}" connected from IP: "{client_ip}"')
+            while True:
+                data = frame_reader.read_frame()
+                if data is None:
+                    break
 
-        if len(self.game_data['clients']) == CONN_LIMIT:
-            self.game_data['game_status'] = GameStatus['ship_lock'].name
+                if not self.handle_frame(connection, data, client_ip):
+                    break
+        except socket.error as error:
+            logging.info(f'Connection lost with client "{client_name}": {error!r}')
+        except Exception as error:
+            logging.info(f'Protocol error from client "{client_name}": {error!r}')
+        finally:
+            # A connection that could not be opened released what it took
+            if connection is not None:
+                self.remove_connection(connection)
+
+                # Writer sends what is still queued before socket is closed
+                self.write_message(connection, None)
+                writer_thread.join(SEND_DRAIN_TIMEOUT)
+
+            self.__close_socket(client_socket)
+
+            # Match of a socket closed by server is already ended, peers
+            # that leave or drop their connection end it here
+            if connection is not None and not (
+                connection['closed_by_server'] or connection['spectator']
+            ):
+                logging.info(f'Closing match {connection["match"].match_id}')
+                self.end_game(connection['match'])
+
+    def client_writer(self, connection: dict) -> None:
+        """
+          This function runs on the writer thread of a client, it sends
+          queued frames until it gets None or socket is closed.
+        """
 
         try:
             while True:
-                data = client_socket.recv(BUFFER_SIZE)
-                if not data:
+                message = connection['send_queue'].get()
+                if message is None:
                     break
 
-                decoded_data = self.decode_data(data)
-                logging.info(f'Received data: {decoded_data}')
-
-                if (
-                    self.game_data['game_status'] == GameStatus['ship_lock'].name
-                    and self.check_if_ships_are_locked()
-                ):
-                    self.game_data['game_status'] = GameStatus['battle'].name
-
-                if (
-                    self.game_data['game_status'] == GameStatus['battle'].name
-                    and self.game_data['winner']
-                ):
-                    self.game_data['game_status'] = GameStatus['finished'].name
-
-                if 'request' in decoded_data:
-                    if decoded_data['request'] == 'ship_locked':
-                        self.game_data['clients'][client_name]['ship_locked'] = True
-                        self.game_data['game_grid'][client_name] = decoded_data['grid']
-                        
-                        self.send_data_to_client(
-                            {'message': 'ok'}, client_name)
-
-                    if decoded_data['request'] == 'reset_game':
-                        self.reset_game()
-                        self.send_data_to_client(
-                            {'message': 'ok'}, client_name)
-
-                    if decoded_data['request'] == 'disconnect':
-                        logging.info(f'Client disconnected: {client_name}')
-                        break
-
-                    if decoded_data['request'] == 'game_data':
-                        self.send_data_to_client(
-                            self.game_data['clients'], client_name)
-
-                    if decoded_data['request'] == 'game_status':
-                        self.send_data_to_client(
-                            {'game_status': self.game_data['game_status']}, client_name)
-
-                    if decoded_data['request'] == 'winner':
-                        self.send_data_to_client(
-                            {'winner': self.game_data['winner']}, client_name)
-
-                    if decoded_data['request'] == 'attack_tile':
-                        ship_name = self.attack_enemy_tile(
-                            client_name, decoded_data['position'])
-                        self.game_data['clients'][client_name]['attacked_tile'] = {
-                            'position': decoded_data['position'],
-                            'ship_name': ship_name
-                        }
-                        
-                        self.send_data_to_client(
-                            {'attacked': ship_name}, client_name)
-
-                    if decoded_data['request'] == 'ship_sinked':
-                        self.game_data['clients'][client_name]['sinked_ships'] += 1
-                        if self.game_data['clients'][client_name]['sinked_ships'] >= len(SHIPS_NAMES):
-                            self.game_over(client_name)
-                        
-                        self.send_data_to_client(
-                            {'message': 'ok'}, client_name)
-                else:
-                    self.send_data_to_client({'message': 'ok'}, client_name)
+                connection['socket'].sendall(message)
+                self.metrics.record_bytes_sent(len(message))
         except socket.error:
-            socket_disconnected = True
-            logging.info(f'Client disconnected by server: {client_name}')
+            logging.info(f'Could not send data to: {connection["client_name"]}')
 
-        self.__remove_client_from_server(client_name)
-        if not socket_disconnected:
-            client_socket.shutdown(socket.SHUT_RDWR)
-            client_socket.close()
-
-            logging.info(f'Closing game')
-            self.end_game()
-
-    @thread_safe
-    def send_data_to_clients(self, data: object, sender_name: str = None) -> None:
-        """ This function sends data to all clients. """
-
-        message = self.create_datagram(BUFFER_SIZE, data)
-        for client_name in self.game_data['sockets']:
-            if client_name != sender_name:
-                self.game_data['sockets'][client_name].sendall(message)
-
-    @thread_safe
-    def send_data_to_client(self, data: object, client_name: str) -> None:
-        """ This function sends data to a specific client. """
-
-        message = self.create_datagram(BUFFER_SIZE, data)
-        self.game_data['sockets'][client_name].sendall(message)
-
-    @thread_safe
-    def end_game(self) -> None:
-        """ This function ends game by cleaning server connections. """
-
-        for client_name in self.game_data['sockets']:
-            self.game_data['sockets'][client_name].shutdown(socket.SHUT_RDWR)
-            self.game_data['sockets'][client_name].close()
-
-        self.is_first_player = True
-        self.game_data['clients'] = {}
-        self.game_data['winner'] = None
-        self.game_data['game_status'] = GameStatus['player_disconnected'].name
-
-    @thread_safe
-    def reset_game(self) -> None:
-        """ This function reset game data. """
-
-        self.is_first_player = True
-        for client_name in self.game_data['clients']:
-            self.game_data['clients'][client_name] = {
-                'attacked_tile': {
-                    'ship_name': None,
-                    'position': None
-                },
-                'sinked_ships': 0,
-                'ship_locked': False,
-                'my_turn': self.is_first_player
-            }
-            self.is_first_player = False
-            self.game_data['game_grid'][client_name] = None
-
-        self.game_data['winner'] = None
-        self.game_data['game_status'] = GameStatus['ship_lock'].name
-
-    @thread_safe
-    def check_if_ships_are_locked(self) -> bool:
-        """ This function checks clients locked their ships. """
-        return all(
-            self.game_data['game_grid'][client_name] is not None
-            for client_name in self.game_data['game_grid'])
-
-    @thread_safe
-    def game_over(self, loser_name: str) -> None:
+    def reject_client(self, client_socket: socket.socket, reason: str = 'server_full') -> None:
+        """
+          This function tells a client why it is rejected and closes its
+          socket. Bytes client already sent are read first, otherwise
+          closing would reset the connection before client reads why.
         """
-          This function looks for the winner name by filtering using loser name.
 
-          Server maintain a tracking of players grids an their attacks attemps,
-          but clients notifies when a ship sinks.
+        try:
+            client_socket.sendall(self.create_datagram({'message': reason}))
+            client_socket.setblocking(False)
+            client_socket.recv(BUFFER_SIZE)
+        except socket.error:
+            pass
+
+        self.__close_socket(client_socket)
+
+    def write_message(self, connection: dict, message: Union[bytes, None]) -> None:
         """
-        self.game_data['winner'] = next(
-            (
-                client_name
-                for client_name in self.game_data['clients']
-                if client_name != loser_name
-            ), None)
-
-    @thread_safe
-    def attack_enemy_tile(self, attacker_name: str, position: Tuple[float, float]) -> str:
-        """ This function checks if position hits an enemy ship and updates turn. """
-
-        # Update players turn and get enemy grid
-        enemy_grid = None
-        for client_name in self.game_data['clients']:
-            if client_name == attacker_name:
-                self.game_data['clients'][client_name]['my_turn'] = False
-            else:
-                enemy_grid = self.game_data['game_grid'][client_name]
-                self.game_data['clients'][client_name]['my_turn'] = True
-
-        if (
-            enemy_grid
-            and enemy_grid[position[1]][position[0]] in SHIPS_NAMES
-        ):
-            ship_name = enemy_grid[position[1]][position[0]]
-            enemy_grid[position[1]][position[0]] = 'X'
-            return ship_name
-
-        return None
-
-    @thread_safe
-    def get_connected_clients(self) -> List[str]:
-        """ This function returns connected clients. """
-        return self.game_data['clients'].keys()
-
-    @thread_safe
-    def __add_client_to_server(
-            self,
-            client_name: str,
-            client_socket: socket.socket) -> None:
-        """ This function adds a client to game_data. """
-
-        self.game_data['clients'][client_name] = {
-            'attacked_tile': {
-                'ship_name': None,
-                'position': None
-            },
-            'sinked_ships': 0,
-            'ship_locked': False,
-            'my_turn': self.is_first_player
-        }
-        self.game_data['game_grid'][client_name] = None
-        self.game_data['sockets'][client_name] = client_socket
-        self.is_first_player = False
-
-    @thread_safe
-    def __remove_client_from_server(self, client_name: str) -> None:
-        """ This function removes client from game_data. """
-        self.game_data['clients'].pop(client_name, None)
-        self.game_data['sockets'].pop(client_name, None)
-        self.game_data['game_grid'].pop(client_name, None)
+          This function queues a frame to be sent to a client, clients
+          whose queue is full are too slow and get disconnected. None
+          stops the writer thread of the client.
+        """
+
+        try:
+            connection['send_queue'].put_nowait(message)
+        except queue.Full:
+            logging.info(f'Client too slow, disconnecting: {connection["client_name"]}')
+            self.__close_socket(connection['socket'])
+
+    def close_client(self, connection: dict) -> None:
+        """ This function closes the socket of a client whose match is ended by server. """
+
+        connection['closed_by_server'] = True
+        self.__close_socket(connection['socket'])
+
+    def __close_socket(self, client_socket: socket.socket) -> None:
+        """ This function closes a socket that may be already closed by its peer. """
+
+        try:
+            client_socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+
+        client_socket.close()
@@ -0,0 +1,179 @@
+import os
+import json
+import zlib
+import struct
+import logging
+import threading
+from typing import Dict, Iterator, Tuple, Union
+
+from networking.decorator import thread_safe
+from networking.constants import STATE_COMMIT_INTERVAL, STATE_CHECKPOINT_RECORDS
+
+
+# Every WAL record is its JSON length and CRC32 followed by the JSON,
+# a record cut by a crash fails its length or CRC and ends recovery
+WAL_RECORD = struct.Struct('!II')
+
+
+class StateStore:
+    """
+      This class persists the state of running matches so a server can
+      rebuild them after a restart.
+
+      Every state change is a record with the full state of a match, or
+      None once it ended, appended to a write-ahead log. Records are
+      only queued by save, a flusher thread writes queued records and
+      fsyncs them every STATE_COMMIT_INTERVAL seconds, so many changes
+      share a single fsync and requests never wait for the disk.
+
+      After STATE_CHECKPOINT_RECORDS records, state of live matches is
+      written to a checkpoint file and WAL starts again empty, so
+      recovery reads one checkpoint and a bounded WAL.
+    """
+
+    def __init__(
+            self,
+            state_path: str,
+            commit_interval: float = STATE_COMMIT_INTERVAL,
+            checkpoint_records: int = STATE_CHECKPOINT_RECORDS) -> None:
+        self.checkpoint_path = state_path
+        self.wal_path = f'{state_path}.wal'
+        self.commit_interval = commit_interval
+        self.checkpoint_records = checkpoint_records
+
+        self.lock = threading.RLock()
+        self.stop_event = threading.Event()
+        self.flusher_thread = None
+        self.wal_file = None
+        self.wal_records = 0
+
+        # Last state of every live match and records waiting for a commit
+        self.matches = {}
+        self.pending_records = []
+
+    def recover(self) -> Dict[int, dict]:
+        """
+          This function loads checkpoint, replays WAL on top of it and
+          returns the state of every live match. Recovered state is
+          checkpointed and flusher thread starts, so store is ready
+          for save.
+        """
+
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r') as checkpoint_file:
+                self.matches = {
+                    int(match_id): state
+                    for match_id, state in json.load(checkpoint_file).items()
+                }
+
+        if os.path.exists(self.wal_path):
+            with open(self.wal_path, 'rb') as wal_file:
+                wal_data = wal_file.read()
+
+            for match_id, state in self.__read_records(wal_data):
+                if state is None:
+                    self.matches.pop(match_id, None)
+                else:
+                    self.matches[match_id] = state
+
+        self.__write_checkpoint(dict(self.matches))
+
+        self.flusher_thread = threading.Thread(target=self.flusher, daemon=True)
+        self.flusher_thread.start()
+
+        return dict(self.matches)
+
+    @thread_safe
+    def save(self, match_id: int, state: Union[dict, None]) -> None:
+        """
+          This function queues the state of a match, None means match
+          ended. State is encoded right away, so caller may change it.
+        """
+
+        record = json.dumps({'match_id': match_id, 'state': state}).encode('utf-8')
+        self.pending_records.append(WAL_RECORD.pack(len(record), zlib.crc32(record)) + record)
+
+        if state is None:
+            self.matches.pop(match_id, None)
+        else:
+            self.matches[match_id] = state
+
+    def flusher(self) -> None:
+        """ This function commits queued records in groups until store is closed. """
+
+        while not self.stop_event.wait(self.commit_interval):
+            self.commit()
+
+        self.commit()
+
+    def commit(self) -> None:
+        """
+          This function writes and fsyncs queued records, or writes a
+          checkpoint instead once WAL has enough records.
+        """
+
+        with self.lock:
+            records = self.pending_records
+            self.pending_records = []
+            if not records:
+                return
+
+            checkpoint = None
+            if self.wal_records + len(records) >= self.checkpoint_records:
+                checkpoint = dict(self.matches)
+
+        try:
+            if checkpoint is not None:
+                self.__write_checkpoint(checkpoint)
+            else:
+                self.wal_file.write(b''.join(records))
+                self.wal_file.flush()
+                os.fsync(self.wal_file.fileno())
+                self.wal_records += len(records)
+        except OSError as error:
+            logging.error(f'Could not persist match state: {error}')
+
+    def close(self) -> None:
+        """ This function commits queued records and closes WAL. """
+
+        if self.flusher_thread:
+            self.stop_event.set()
+            self.flusher_thread.join()
+            self.flusher_thread = None
+
+        if self.wal_file:
+            self.wal_file.close()
+            self.wal_file = None
+
+    def __write_checkpoint(self, matches: Dict[int, dict]) -> None:
+        """
+          This function atomically replaces checkpoint with the state of
+          live matches and starts an empty WAL.
+        """
+
+        temporary_path = f'{self.checkpoint_path}.tmp'
+        with open(temporary_path, 'w') as checkpoint_file:
+            json.dump(matches, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, self.checkpoint_path)
+
+        if self.wal_file:
+            self.wal_file.close()
+        self.wal_file = open(self.wal_path, 'wb')
+        self.wal_records = 0
+
+    def __read_records(self, wal_data: bytes) -> Iterator[Tuple[int, Union[dict, None]]]:
+        """ This function yields WAL records until the end or a torn record. """
+
+        offset = 0
+        while offset + WAL_RECORD.size <= len(wal_data):
+            record_size, record_crc = WAL_RECORD.unpack_from(wal_data, offset)
+            record = wal_data[offset + WAL_RECORD.size:offset + WAL_RECORD.size + record_size]
+            if len(record) != record_size or zlib.crc32(record) != record_crc:
+                logging.info(f'Ignoring torn WAL record at offset {offset}')
+                return
+
+            decoded_record = json.loads(record)
+            yield decoded_record['match_id'], decoded_record['state']
+            offset += WAL_RECORD.size + record_size
@@ -25,7 +25,8 @@ class Battle:
             'winner_name': None,
             'game_finished': False,
             'maps_ships_loaded': False,
-            'last_selected_ship': -1
+            'last_selected_ship': -1,
+            'pending_attack': None
         }
 
         self.gui_items = self.__load_gui_items()
@@ -74,42 +75,56 @@ class Battle:
           attack enemy ship.
         """
 
-        if event.type == pygame.MOUSEBUTTONDOWN:
+        if event.type == pygame.MOUSEBUTTONDOWN and not self.states['pending_attack']:
             tile_pos = grid.translate_position(event.pos)
             if grid.is_valid_position(tile_pos):
-                ship_name = self.states['client'].attack_enemy_tile(tile_pos)
+                attack = self.states['client'].attack_enemy_tile_async(tile_pos)
+                self.states['pending_attack'] = (attack, tile_pos, event.pos)
 
-                if ship_name:
-                    explosion = Explosion(
-                        pos_x=event.pos[0],
-                        pos_y=event.pos[1],
-                        stop_after_finish=True
-                    )
-                    
-                    grid.game_grid[tile_pos[1]][tile_pos[0]] = 'X'
+    def resolve_pending_attack(self, grid: Grid) -> None:
+        """
+          This function draws the result of the last attack of
+          this player on enemy grid once server has answered it.
+        """
+
+        if not self.states['pending_attack']:
+            return
+
+        attack, tile_pos, mouse_pos = self.states['pending_attack']
+        if not attack.done():
+            return
+
+        self.states['pending_attack'] = None
+        response = attack.result()
+        if response and response.get('attacked'):
+            explosion = Explosion(
+                pos_x=mouse_pos[0],
+                pos_y=mouse_pos[1],
+                stop_after_finish=True
+            )
+
+            grid.board.shoot(tile_pos[0], tile_pos[1])
 
-                    centered_pos = grid.center_position(event.pos)
-                    explosion.center_animation_from_position(centered_pos)
-                    self.gui_items['enemy_fire']['item'].append(explosion)
+            centered_pos = grid.center_position(mouse_pos)
+            explosion.center_animation_from_position(centered_pos)
+            self.gui_items['enemy_fire']['item'].append(explosion)
 
     def receive_enemy_attack(
             self,
             grid: Grid,
-            ships: list) -> None:
-        """ This function check if enemy attack hits a ship """
-
-        response = self.states['client'].get_game_data()
-        enemy_data = next(
-            (
-                value
-                for key, value in response.items()
-                if key != self.states['client'].client_name), None)
+            ships: list,
+            attacked_tile: dict) -> None:
+        """
+          This function check if enemy attack hits a ship. Server
+          tracks sunk ships, so ship life is only updated to be shown.
+        """
+
         if (
-            enemy_data['attacked_tile']['ship_name']
-            and enemy_data['attacked_tile']['ship_name'] != 'X'
+            attacked_tile['ship_name']
+            and attacked_tile['ship_name'] != 'X'
         ):
-            position = enemy_data['attacked_tile']['position']
-            if grid.game_grid[position[1]][position[0]] != 'X':
+            position = attacked_tile['position']
+            if not grid.board.was_shot(position[0], position[1]):
                 rescaled_pos = grid.upscale_position(position)
                 rescaled_pos = grid.center_position(rescaled_pos)
 
@@ -123,12 +138,9 @@ class Battle:
                     (
                         ship
                         for ship in ships
-                        if ship.name == enemy_data['attacked_tile']['ship_name']), None)
+                        if ship.name == attacked_tile['ship_name']), None)
                 attacked_ship.get_attacked()
-                grid.game_grid[position[1]][position[0]] = 'X'
-
-                if attacked_ship.get_ship_life() == 0:
-                    self.states['client'].ship_sinked()
+                grid.board.shoot(position[0], position[1])
 
                 explosion.center_animation_from_position(rescaled_pos)
                 self.gui_items['ally_fire']['item'].append(explosion)
@@ -158,7 +170,8 @@ class Battle:
             pygame.quit()
             sys.exit()
 
-        is_my_turn = self.states['client'].is_my_turn()
+        self.states['client'].poll_events()
+        is_my_turn = self.states['client'].my_turn
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -180,13 +193,18 @@ class Battle:
         self.check_player_turn(is_my_turn)
 
         if self.states['maps_ships_loaded']:
-            self.receive_enemy_attack(
-                self.map_widget.ally_map, self.ships)
+            self.resolve_pending_attack(self.map_widget.enemy_map)
+
+            for event in self.states['client'].pop_events():
+                if event['event'] == 'attacked':
+                    self.receive_enemy_attack(
+                        self.map_widget.ally_map, self.ships, event)
+
             self.states['last_selected_ship'] = self.__show_ship_life_status()
             self.__handle_attack_animation()
             self.map_widget.handle_button_tabs_events()
 
-        winner_name = self.states['client'].get_winner()
+        winner_name = self.states['client'].winner
         if winner_name:
             self.states['winner_name'] = winner_name
             self.states['game_finished'] = True
@@ -58,6 +58,7 @@ class Intro:
 
         client = Client(username, host_address, host_post)
         if client.connect_to_server():
+            client.subscribe()
             self.states['client'] = client
             
             label_offset = (5, 0)
@@ -77,13 +78,13 @@ class Intro:
     
     def all_players_connected(self) -> bool:
         """
-          This function fetchs game status from server
+          This function reads game status pushed by server
           and checks if all clients are ready.
         """
         
         if self.states['client']:
-            game_status = self.states['client'].get_game_status()
-            return game_status != 'lobby'
+            self.states['client'].poll_events()
+            return self.states['client'].game_status not in (None, 'lobby')
         
         return False
     
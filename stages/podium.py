@@ -68,8 +68,8 @@ class Podium:
         """ This function checks if game is reseted. """
 
         if self.states['client']:
-            game_status = self.states['client'].get_game_status()
-            return game_status == 'ship_lock'
+            self.states['client'].poll_events()
+            return self.states['client'].game_status == 'ship_lock'
 
         return False
 
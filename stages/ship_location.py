@@ -79,24 +79,29 @@ class ShipLocation:
 
     def is_game_started(self) -> bool:
         """
-          This function fetch game status from server
+          This function reads game status pushed by server
           and checks if all clients locked their ship.
         """
 
         if self.states['client']:
-            game_status = self.states['client'].get_game_status()
-            return game_status == 'battle'
+            self.states['client'].poll_events()
+            return self.states['client'].game_status == 'battle'
 
         return False
 
     def lock_ships_position(self) -> None:
-        """ This function notifies to server that a client locked ships. """
+        """
+          This function notifies to server that a client locked ships.
+          Ships stay unlocked if server rejects their placements.
+        """
 
         if self.states['client']:
-            self.ships = self.map_widget.ally_map.locate_ships_into_game_grid(
-                self.ships)
-            self.states['client'].lock_ships(
-                self.map_widget.ally_map.game_grid)
+            ally_map = self.map_widget.ally_map
+            fleet = ally_map.get_fleet_placements(self.ships)
+            if not self.states['client'].lock_ships(fleet):
+                return
+
+            self.ships = ally_map.locate_fleet(self.ships, fleet)
 
             self.gui_items['conn_label']['enabled'] = True
             self.gui_items['lock_ships']['enabled'] = False
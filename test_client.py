@@ -1,50 +1,236 @@
+import time
+import random
+import asyncio
+import logging
+import argparse
+import threading
+from typing import Callable, List, Union
+
 from networking.client import Client
+from networking.server import Server
+from networking.async_server import AsyncServer
+from engine.fleet import random_fleet
+from networking.metrics import LatencyHistogram
+from networking.log_pipeline import configure_logging
+from networking.decorator import thread_safe
+from networking.constants import GameStatus
+from engine.constants import GRID_SIZE
+
+
+REPORT_PERCENTILES = (50, 95, 99)
+ENDED_STATUSES = (GameStatus['finished'].name, GameStatus['player_disconnected'].name)
+
+
+class LoadStats:
+    """
+      This class collects latency and errors of every request type
+      sent by simulated players, and the games they finished.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.histograms = {}
+        self.errors = {}
+        self.finished_games = 0
+        self.started_at = time.perf_counter()
+
+    @thread_safe
+    def record(self, request_type: str, latency: float, is_error: bool) -> None:
+        """ This function records a request, its latency in seconds and if it failed. """
+
+        if request_type not in self.histograms:
+            self.histograms[request_type] = LatencyHistogram()
+            self.errors[request_type] = 0
+
+        self.histograms[request_type].record(int(latency * 1000000))
+        self.errors[request_type] += is_error
+
+    @thread_safe
+    def record_game(self) -> None:
+        """ This function counts a game played until a player won. """
+        self.finished_games += 1
+
+    @thread_safe
+    def get_report(self) -> str:
+        """ This function returns throughput, latency percentiles and error rates. """
+
+        elapsed = time.perf_counter() - self.started_at
+        total_requests = sum(histogram.total_count for histogram in self.histograms.values())
+        lines = [
+            f'{self.finished_games} games in {elapsed:.2f}s '
+            f'({self.finished_games / elapsed:.2f} games/s), '
+            f'{total_requests} requests ({total_requests / elapsed:.0f} requests/s)',
+            f'{"request":<14}{"count":>9}{"errors":>9}'
+            + ''.join(f'{f"p{percentile} ms":>10}' for percentile in REPORT_PERCENTILES)
+        ]
+
+        for request_type, histogram in sorted(self.histograms.items()):
+            error_rate = self.errors[request_type] / histogram.total_count
+            lines.append(
+                f'{request_type:<14}{histogram.total_count:>9}{error_rate:>9.2%}'
+                + ''.join(
+                    f'{histogram.get_percentile(percentile) / 1000:>10.3f}'
+                    for percentile in REPORT_PERCENTILES))
+
+        return '\n'.join(lines)
+
+
+class LoadPlayer:
+    """
+      This class plays full games against a server the way a game
+      client does: it polls sync, locks a random fleet and attacks
+      random tiles on its turn, waiting think time between requests.
+    """
+
+    def __init__(
+            self,
+            player_name: str,
+            arguments: argparse.Namespace,
+            stats: LoadStats) -> None:
+        self.player_name = player_name
+        self.arguments = arguments
+        self.stats = stats
+        self.rng = random.Random(player_name)
+
+    def run(self) -> None:
+        """ This function plays games one after another. """
+
+        for game_number in range(self.arguments.games):
+            self.play_game(game_number)
+
+    def play_game(self, game_number: int) -> None:
+        """
+          This function connects, waits for an opponent and plays a game
+          until its end. Every game uses its own player name, server may
+          not have released the name of the previous game yet.
+        """
+
+        client = Client(
+            f'{self.player_name}-{game_number}', self.arguments.host, self.arguments.port)
+        started_at = time.perf_counter()
+        is_connected = client.connect_to_server()
+        self.stats.record('connect', time.perf_counter() - started_at, not is_connected)
+        if not is_connected:
+            return
+
+        shots = [(x, y) for x in range(GRID_SIZE) for y in range(GRID_SIZE)]
+        self.rng.shuffle(shots)
+        fleet_locked = False
+        deadline = time.monotonic() + self.arguments.game_timeout
+
+        while time.monotonic() < deadline:
+            sync = self.request(client, {'request': 'sync'})
+            if sync is None:
+                return
+
+            if sync['winner'] or sync['game_status'] in ENDED_STATUSES:
+                break
+
+            if sync['game_status'] == GameStatus['ship_lock'].name and not fleet_locked:
+                response = self.request(
+                    client, {'request': 'ship_locked', 'fleet': random_fleet(self.rng)})
+                fleet_locked = bool(response) and response.get('message') == 'ok'
+            elif sync['game_status'] == GameStatus['battle'].name and sync['my_turn']:
+                response = self.request(
+                    client, {'request': 'attack_tile', 'position': shots.pop()})
+                if response and response.get('game_over'):
+                    # Winner waits for loser to see the winner and leave
+                    self.wait_disconnection(client, deadline)
+                    self.stats.record_game()
+                    return
+
+            time.sleep(self.arguments.think_time)
+        else:
+            self.stats.record('timeout', 0, True)
+
+        client.disconnect()
+
+    def request(self, client: Client, data: dict) -> Union[dict, None]:
+        """ This function sends a request, waits for its response and records it. """
+
+        started_at = time.perf_counter()
+        response = client.send_data_to_server(data)
+        self.stats.record(
+            data['request'],
+            time.perf_counter() - started_at,
+            response is None or response.get('message') in ('invalid_fleet', 'invalid_attack'))
+
+        return response
+
+    def wait_disconnection(self, client: Client, deadline: float) -> None:
+        """ This function waits until server closes an ended match. """
+
+        while not client.is_disconnected and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+def start_local_server(server_type: str, host_address: str, host_port: int) -> Callable[[], None]:
+    """
+      This function starts a server of the given type on background
+      threads and returns a function that stops it.
+    """
+
+    if server_type == 'threaded':
+        server = Server(host_address, host_port)
+        server.start_server()
+        return server.stop_server
 
+    server = AsyncServer(host_address, host_port)
+    loop = asyncio.new_event_loop()
+    threading.Thread(
+        target=lambda: loop.run_until_complete(server.serve_forever()), daemon=True).start()
 
-host_address = 'localhost'
-host_port = 65432
+    return lambda: loop.call_soon_threadsafe(server.stop_server)
 
-grid = [[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, "C", 0, 0, 0, "D", 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, "B", 0, 0, 0, "C", 0, 0, 0, "D", 0, 0, 0, "S", 0, 0, 0, 0],
-        [0, 0, 0, "B", 0, 0, 0, "C", 0, 0, 0, "D", 0, 0, 0, "S", 0, 0, 0, 0],
-        [0, 0, 0, "B", 0, 0, 0, "C", 0, 0, 0, "D", 0, 0, 0, "S", 0, 0, 0, 0],
-        [0, 0, 0, "B", 0, 0, 0, "C", 0, 0, 0, "D", 0, 0, 0, "S", 0, 0, 0, 0],
-        [0, 0, 0, "B", 0, 0, 0, "C", 0, 0, 0, 0, 0, 0, 0, "S", 0, 0, 0, 0],
-        [0, 0, 0, "B", 0, 0, 0, "C", 0, 0, 0, 0, 0, 0, 0, "S", 0, 0, 0, 0],
-        ["R", 0, 0, "B", 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, "S", 0, 0, 0, 0],
-        ["R", 0, 0, "B", 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        ["R", 0, 0, "B", 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        ["R", 0, 0, "B", 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        ["R", 0, 0, "B", 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]]
 
+def run_load(arguments: argparse.Namespace) -> LoadStats:
+    """ This function plays games with every simulated pair of players at once. """
 
-linkrs = Client('LinkRs', host_address, host_port)
-zeldars = Client('ZeldaRs', host_address, host_port)
+    stats = LoadStats()
+    players = [
+        LoadPlayer(f'load-{pair}-{side}', arguments, stats)
+        for pair in range(arguments.pairs)
+        for side in ('a', 'b')
+    ]
+    player_threads: List[threading.Thread] = [
+        threading.Thread(target=player.run, daemon=True) for player in players
+    ]
 
-linkrs.connect_to_server()
-zeldars.connect_to_server()
+    for player_thread in player_threads:
+        player_thread.start()
+    for player_thread in player_threads:
+        player_thread.join()
 
+    return stats
 
-linkrs.lock_ships(grid)
-zeldars.lock_ships(grid)
 
-print('Before attack')
-print(linkrs.get_game_data())
-print(zeldars.get_game_data())
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Play simulated games against a server and report its performance.')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=65432)
+    parser.add_argument('--pairs', type=int, default=1, help='pairs of players playing at once')
+    parser.add_argument('--games', type=int, default=1, help='games played by every player')
+    parser.add_argument('--think-time', type=float, default=0.01,
+                        help='seconds waited between requests')
+    parser.add_argument('--game-timeout', type=float, default=120,
+                        help='seconds before a game is given up')
+    parser.add_argument('--server', choices=('none', 'threaded', 'async'), default='none',
+                        help='start a local server in this process instead of using a running one')
+    arguments = parser.parse_args()
 
+    configure_logging(logging.WARNING)
+    stop_server = None
+    if arguments.server != 'none':
+        stop_server = start_local_server(arguments.server, arguments.host, arguments.port)
+        time.sleep(0.5)
 
-linkrs.attack_enemy_tile((13, 0))
-zeldars.attack_enemy_tile((14, 0))
+    try:
+        print(run_load(arguments).get_report())
+    finally:
+        if stop_server:
+            stop_server()
 
 
-print('After attack')
-print(linkrs.get_game_data())
-print(zeldars.get_game_data())
+if __name__ == '__main__':
+    main()
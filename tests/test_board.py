@@ -0,0 +1,76 @@
+from engine.board import Board
+from engine.fleet import place_fleet
+from engine.constants import GRID_SIZE, SHIPS_NAMES, SHIPS_SIZES
+
+
+def row_board():
+    """ This function returns a board with a ship per row, starting at column 0. """
+    return Board(place_fleet([[ship_name, 0, row, False] for row, ship_name in enumerate(SHIPS_NAMES)]))
+
+
+def sink(board, row):
+    """ This function shoots every tile of the ship of a row and returns the last result. """
+
+    result = None
+    for x in range(SHIPS_SIZES[SHIPS_NAMES[row]]):
+        result = board.shoot(x, row)
+    return result
+
+
+def test_shoot_reports_hits_and_misses():
+    board = row_board()
+
+    assert board.shoot(0, 0) == (SHIPS_NAMES[0], False)
+    assert board.shoot(GRID_SIZE - 1, GRID_SIZE - 1) == (None, False)
+    assert board.was_shot(0, 0) and board.was_shot(GRID_SIZE - 1, GRID_SIZE - 1)
+
+
+def test_shoot_reports_sunk_ship_once_every_tile_is_hit():
+    board = row_board()
+
+    assert sink(board, 1) == (SHIPS_NAMES[1], True)
+    assert board.is_sunk(SHIPS_NAMES[1])
+    assert board.count_sunk() == 1
+
+
+def test_tiles_already_shot_hit_nothing():
+    board = row_board()
+    board.shoot(0, 0)
+
+    assert board.shoot(0, 0) == (None, False)
+
+
+def test_shoot_ignores_tiles_outside_the_board():
+    board = row_board()
+
+    assert board.shoot(-1, 0) == (None, False)
+    assert board.shoot(0, GRID_SIZE) == (None, False)
+    assert board.shots == 0
+
+
+def test_shoot_ignores_non_integer_coordinates():
+    board = row_board()
+
+    assert board.shoot(0.0, 0) == (None, False)
+    assert board.shoot(0, '0') == (None, False)
+    assert board.shots == 0
+
+
+def test_all_sunk_once_every_ship_sank():
+    board = row_board()
+    for row in range(len(SHIPS_NAMES) - 1):
+        sink(board, row)
+    assert not board.all_sunk()
+
+    sink(board, len(SHIPS_NAMES) - 1)
+    assert board.all_sunk()
+
+
+def test_snapshot_round_trip():
+    board = row_board()
+    board.shoot(0, 0)
+    board.shoot(5, 10)
+
+    restored = Board.from_snapshot(board.get_snapshot())
+    assert restored.get_snapshot() == board.get_snapshot()
+    assert restored.shoot(0, 0) == (None, False)
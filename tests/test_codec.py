@@ -0,0 +1,67 @@
+import pytest
+
+from engine.constants import SHIPS_NAMES
+from networking.network import BinaryCodec, JsonCodec
+
+
+MESSAGES = [
+    {'request': 'game_status'},
+    {'request': 'attack_tile', 'position': [3, 17]},
+    {'request': 'ship_locked', 'fleet': [[SHIPS_NAMES[0], 0, 1, True], [SHIPS_NAMES[1], 5, 6, False]]},
+    {'message': 'ok'},
+    {'game_status': 'battle'},
+    {'winner': None},
+    {'winner': 'player'},
+    {'attacked': SHIPS_NAMES[2], 'sunk': True, 'game_over': False},
+    {'attacked': None, 'sunk': False, 'game_over': False},
+    {'event': 'game_status', 'game_status': 'ship_lock'},
+    {'event': 'turn', 'my_turn': True},
+    {'event': 'attacked', 'attacker': 'enemy', 'position': [0, 19], 'ship_name': None, 'sunk': False},
+    {'event': 'winner', 'winner': 'enemy'},
+    {
+        'my_turn': False,
+        'attacked_tile': {'position': [4, 4], 'ship_name': SHIPS_NAMES[3], 'sunk': True},
+        'game_status': 'finished',
+        'winner': 'player'
+    },
+    {'message': 'unknown_request'},
+    {'request': 'attack_tile', 'position': [300, 1]},
+    {'request': 'attack_tile', 'position': [1.5, 1]},
+    {'metrics': {'requests': {'sync': 3}}},
+    [1, 'list', None],
+]
+
+
+@pytest.mark.parametrize('message', MESSAGES)
+@pytest.mark.parametrize('codec', [BinaryCodec(), JsonCodec()], ids=['binary', 'json'])
+def test_codec_round_trip(codec, message):
+    assert codec.decode(codec.encode(message)) == message
+
+
+def test_binary_codec_packs_frequent_messages_compactly():
+    codec = BinaryCodec()
+
+    assert len(codec.encode({'request': 'sync'})) == 1
+    assert len(codec.encode({'request': 'attack_tile', 'position': [3, 17]})) == 3
+    assert codec.encode({'message': 'unknown_request'})[0] == BinaryCodec.OP_JSON
+
+
+def test_binary_codec_rejects_unknown_opcodes():
+    with pytest.raises(ValueError):
+        BinaryCodec().decode(bytes((0xFE,)))
+
+
+@pytest.mark.parametrize('key', ['request', 'game_status', 'winner', 'event', 'message'])
+def test_binary_codec_round_trips_dicts_under_message_keys(key):
+    # Values of protocol keys may be dicts, like players named after them in game data
+    message = {key: {'my_turn': True, 'ship_locked': False}}
+    codec = BinaryCodec()
+
+    assert codec.decode(codec.encode(message)) == message
+
+
+def test_binary_codec_round_trips_events_with_invalid_game_status():
+    message = {'event': 'game_status', 'game_status': ['battle']}
+    codec = BinaryCodec()
+
+    assert codec.decode(codec.encode(message)) == message
@@ -0,0 +1,68 @@
+from networking.event_log import EventLogWriter, EventLogReader, INDEX_INTERVAL
+
+
+def write_events(log_path, events, close=True):
+    writer = EventLogWriter(str(log_path))
+    for match_id, turn in events:
+        writer.append(match_id, turn, {'action': 'attack', 'position': [match_id, turn]})
+
+    if close:
+        writer.close()
+    else:
+        writer.log_file.close()
+
+
+def read_match(log_path, match_id, from_turn=0):
+    with EventLogReader(str(log_path)) as reader:
+        return [(event['match_id'], event['turn']) for event in reader.read_match(match_id, from_turn)]
+
+
+def make_events(count, first_turn=0):
+    return [(turn % 7 + 1, first_turn + turn // 7) for turn in range(count)]
+
+
+def test_read_match_finds_events_across_index_blocks(tmp_path):
+    log_path = tmp_path / 'events.log'
+    events = make_events(INDEX_INTERVAL * 3 + 10)
+    write_events(log_path, events)
+
+    assert read_match(log_path, 3) == [event for event in events if event[0] == 3]
+    assert read_match(log_path, 3, 50) == [
+        event for event in events if event[0] == 3 and event[1] >= 50]
+    assert read_match(log_path, 99) == []
+
+
+def test_read_events_returns_every_event_in_order(tmp_path):
+    log_path = tmp_path / 'events.log'
+    events = make_events(INDEX_INTERVAL + 1)
+    write_events(log_path, events)
+
+    with EventLogReader(str(log_path)) as reader:
+        assert [(event['match_id'], event['turn']) for event in reader.read_events()] == events
+
+
+def test_reopened_log_is_appended_to(tmp_path):
+    log_path = tmp_path / 'events.log'
+    first_events = make_events(INDEX_INTERVAL + 5)
+    second_events = make_events(INDEX_INTERVAL + 5, first_turn=1000)
+    write_events(log_path, first_events)
+    write_events(log_path, second_events)
+
+    assert read_match(log_path, 2) == [
+        event for event in first_events + second_events if event[0] == 2]
+
+
+def test_log_without_trailer_is_scanned_and_appended_to(tmp_path):
+    log_path = tmp_path / 'events.log'
+    first_events = make_events(INDEX_INTERVAL + 5)
+    write_events(log_path, first_events, close=False)
+
+    # A crash may leave a partially written last record
+    with open(log_path, 'ab') as log_file:
+        log_file.write(b'\x01\x00\x00')
+    assert read_match(log_path, 4) == [event for event in first_events if event[0] == 4]
+
+    second_events = make_events(10, first_turn=1000)
+    write_events(log_path, second_events)
+    assert read_match(log_path, 4) == [
+        event for event in first_events + second_events if event[0] == 4]
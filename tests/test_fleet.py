@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from engine.board import Board
+from engine.constants import GRID_SIZE, SHIPS_NAMES, SHIPS_SIZES
+from engine.fleet import place_fleet, random_fleet, edge_fleet
+
+
+def row_fleet():
+    """ This function returns a valid fleet with a ship per row. """
+    return [[ship_name, 0, row, False] for row, ship_name in enumerate(SHIPS_NAMES)]
+
+
+def test_place_fleet_returns_ship_masks():
+    ship_masks = place_fleet(row_fleet())
+
+    assert set(ship_masks) == set(SHIPS_NAMES)
+    for ship_name, ship_mask in ship_masks.items():
+        assert bin(ship_mask).count('1') == SHIPS_SIZES[ship_name]
+
+
+def test_place_fleet_places_vertical_ships_down_columns():
+    fleet = [[ship_name, column, 0, True] for column, ship_name in enumerate(SHIPS_NAMES)]
+    board = Board(place_fleet(fleet))
+
+    ship_name = SHIPS_NAMES[0]
+    for y in range(SHIPS_SIZES[ship_name]):
+        assert board.shoot(0, y)[0] == ship_name
+
+
+@pytest.mark.parametrize('fleet', [
+    row_fleet()[:-1],
+    row_fleet()[:-1] + [row_fleet()[0]],
+    row_fleet()[:-1] + [['X', 0, 10, False]],
+    row_fleet()[:-1] + [[SHIPS_NAMES[-1], 0, 0, False]],
+    row_fleet()[:-1] + [[SHIPS_NAMES[-1], GRID_SIZE - 1, 10, False]],
+    row_fleet()[:-1] + [[SHIPS_NAMES[-1], 0, GRID_SIZE - 1, True]],
+    row_fleet()[:-1] + [[SHIPS_NAMES[-1], -1, 10, False]],
+    row_fleet()[:-1] + [[SHIPS_NAMES[-1], 0.0, 10, False]],
+    row_fleet()[:-1] + [[SHIPS_NAMES[-1], 0, '10', False]],
+], ids=[
+    'missing ship', 'repeated ship', 'unknown ship', 'overlap',
+    'out of grid horizontally', 'out of grid vertically', 'negative position',
+    'float position', 'string position'
+])
+def test_place_fleet_rejects_invalid_fleets(fleet):
+    with pytest.raises(ValueError):
+        place_fleet(fleet)
+
+
+@pytest.mark.parametrize('make_fleet', [random_fleet, edge_fleet])
+def test_generated_fleets_are_valid(make_fleet):
+    rng = random.Random(0)
+    for _ in range(50):
+        place_fleet(make_fleet(rng))
+
@@ -0,0 +1,101 @@
+import time
+import socket
+import threading
+
+import pytest
+
+from networking.constants import MAX_FRAME_SIZE
+from networking.network import BinaryCodec, FrameReader, Network, ProtocolError, FRAME_HEADER
+
+
+@pytest.fixture
+def socket_pair():
+    sockets = socket.socketpair()
+    yield sockets
+    for stream_socket in sockets:
+        stream_socket.close()
+
+
+def frame(payload):
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def send_slowly(sender, data):
+    """ This function sends data one byte at a time from another thread. """
+
+    def send():
+        for position in range(len(data)):
+            sender.sendall(data[position:position + 1])
+            time.sleep(0.001)
+
+    thread = threading.Thread(target=send)
+    thread.start()
+    return thread
+
+
+def test_frame_reader_reassembles_partial_frames(socket_pair):
+    sender, receiver = socket_pair
+    reader = FrameReader(receiver, buffer_size=8)
+    thread = send_slowly(sender, frame(b'split across recv calls') + frame(b'next'))
+
+    # Frames larger than the buffer grow it
+    assert bytes(reader.read_frame()) == b'split across recv calls'
+    assert bytes(reader.read_frame()) == b'next'
+    thread.join()
+
+
+def test_frame_reader_splits_coalesced_frames(socket_pair):
+    sender, receiver = socket_pair
+    reader = FrameReader(receiver, buffer_size=64)
+    payloads = [b'first', b'', b'third' * 20, b'fourth']
+    sender.sendall(b''.join(frame(payload) for payload in payloads))
+
+    for payload in payloads:
+        assert bytes(reader.read_frame()) == payload
+    assert reader.next_buffered_frame() is None
+
+
+def test_frame_reader_keeps_unread_bytes_when_buffer_fills(socket_pair):
+    sender, receiver = socket_pair
+    reader = FrameReader(receiver, buffer_size=16)
+    payloads = [bytes([number]) * 9 for number in range(10)]
+    thread = send_slowly(sender, b''.join(frame(payload) for payload in payloads))
+
+    for payload in payloads:
+        assert bytes(reader.read_frame()) == payload
+    thread.join()
+
+
+def test_frame_reader_returns_none_once_peer_closes(socket_pair):
+    sender, receiver = socket_pair
+    reader = FrameReader(receiver)
+    sender.sendall(frame(b'last') + FRAME_HEADER.pack(10))
+    sender.shutdown(socket.SHUT_WR)
+
+    assert bytes(reader.read_frame()) == b'last'
+    assert reader.read_frame() is None
+
+
+def test_frame_reader_rejects_oversized_frames(socket_pair):
+    sender, receiver = socket_pair
+    reader = FrameReader(receiver)
+    sender.sendall(FRAME_HEADER.pack(MAX_FRAME_SIZE + 1))
+
+    with pytest.raises(ProtocolError):
+        reader.read_frame()
+
+
+def test_pipelined_frames_carry_request_id(socket_pair):
+    sender, receiver = socket_pair
+    network = Network()
+    codec = BinaryCodec()
+    sender.sendall(network.create_datagram({'request': 'winner'}, codec, request_id=42))
+
+    request_id, payload = network.split_request_id(FrameReader(receiver).read_frame())
+    assert request_id == 42
+    assert network.decode_data(payload, codec) == {'request': 'winner'}
+
+
+def test_split_request_id_rejects_short_frames():
+    with pytest.raises(ValueError):
+        Network().split_request_id(b'\x00\x01')
@@ -0,0 +1,248 @@
+import itertools
+
+import pytest
+
+from networking.match import Match
+from engine.constants import GRID_SIZE, SHIPS_NAMES, SHIPS_SIZES
+
+
+# Every ship takes up the start of its own row
+FLEET = [[ship_name, 0, row, False] for row, ship_name in enumerate(SHIPS_NAMES)]
+SHIP_TILES = [
+    (x, row) for row, ship_name in enumerate(SHIPS_NAMES) for x in range(SHIPS_SIZES[ship_name])]
+MISS_TILES = [(x, y) for y in range(GRID_SIZE - 1, len(SHIPS_NAMES), -1) for x in range(GRID_SIZE)]
+
+
+class MatchClients:
+    """ This class stands in for a server, it keeps every frame a match sends. """
+
+    def __init__(self) -> None:
+        self.frames = []
+        self.request_ids = itertools.count(1)
+        self.match = Match(1, self.send_data_to_client, self.send_data_to_clients)
+
+    def send_data_to_client(self, data, client_name, request_id=None):
+        self.frames.append((client_name, data, request_id))
+
+    def send_data_to_clients(self, data, client_names):
+        for client_name in client_names:
+            self.send_data_to_client(data, client_name)
+
+    def request(self, client_name, data):
+        """ This function sends a request to match and returns its response. """
+
+        request_id = next(self.request_ids)
+        self.match.handle_request(client_name, data, request_id)
+        return next(
+            frame for name, frame, frame_id in self.frames
+            if name == client_name and frame_id == request_id)
+
+    def events(self, client_name):
+        """ This function returns events pushed to a client and forgets them. """
+
+        events = [frame for name, frame, frame_id in self.frames if name == client_name and frame_id is None]
+        self.frames = [frame for frame in self.frames if not (frame[0] == client_name and frame[2] is None)]
+        return events
+
+    def attack(self, client_name, position):
+        return self.request(client_name, {'request': 'attack_tile', 'position': position})
+
+
+@pytest.fixture
+def clients():
+    """ This fixture returns a match whose two players, A and B, are in ship lock. """
+
+    clients = MatchClients()
+    clients.match.add_client('A')
+    clients.match.add_client('B')
+    clients.match.push_game_status()
+    return clients
+
+
+@pytest.fixture
+def battle(clients):
+    """ This fixture returns a match in battle where it is the turn of A. """
+
+    for client_name in ('A', 'B'):
+        assert clients.request(client_name, {'request': 'ship_locked', 'fleet': FLEET}) == {'message': 'ok'}
+    return clients
+
+
+def win_as_a(battle):
+    """ This function sinks every ship of B, B misses in between, and returns the last response. """
+
+    for tile, miss in zip(SHIP_TILES, MISS_TILES):
+        response = battle.attack('A', tile)
+        if response['game_over']:
+            return response
+        battle.attack('B', miss)
+
+
+def test_match_is_in_ship_lock_once_full(clients):
+    assert clients.match.game_data['game_status'] == 'ship_lock'
+    assert clients.request('A', {'request': 'game_status'}) == {'game_status': 'ship_lock'}
+
+
+def test_match_starts_battle_once_every_fleet_is_locked(clients):
+    clients.request('A', {'request': 'ship_locked', 'fleet': FLEET})
+    assert clients.match.game_data['game_status'] == 'ship_lock'
+
+    clients.request('B', {'request': 'ship_locked', 'fleet': FLEET})
+    assert clients.match.game_data['game_status'] == 'battle'
+
+
+def test_invalid_fleet_is_rejected(clients):
+    response = clients.request('A', {'request': 'ship_locked', 'fleet': FLEET[:-1]})
+
+    assert response == {'message': 'invalid_fleet'}
+    assert clients.match.game_data['boards']['A'] is None
+
+
+def test_fleet_can_only_be_locked_once(clients):
+    clients.request('A', {'request': 'ship_locked', 'fleet': FLEET})
+    board = clients.match.game_data['boards']['A']
+
+    assert clients.request('A', {'request': 'ship_locked', 'fleet': FLEET}) == {'message': 'invalid_fleet'}
+    assert clients.match.game_data['boards']['A'] is board
+
+
+def test_fleet_lock_in_lobby_is_rejected():
+    clients = MatchClients()
+    clients.match.add_client('A')
+
+    assert clients.request('A', {'request': 'ship_locked', 'fleet': FLEET}) == {'message': 'invalid_fleet'}
+    assert clients.match.game_data['boards']['A'] is None
+
+
+def test_fleet_lock_in_battle_keeps_hits_taken(battle):
+    battle.attack('A', [0, 0])
+
+    assert battle.request('B', {'request': 'ship_locked', 'fleet': FLEET}) == {'message': 'invalid_fleet'}
+    assert battle.match.game_data['boards']['B'].hits != 0
+
+
+def test_attack_response_reports_hit_sunk_and_game_over(battle):
+    assert battle.attack('A', [0, 2]) == {'attacked': SHIPS_NAMES[2], 'sunk': False, 'game_over': False}
+    assert battle.attack('B', [GRID_SIZE - 1, GRID_SIZE - 1]) == {
+        'attacked': None, 'sunk': False, 'game_over': False}
+
+    for x in range(1, SHIPS_SIZES[SHIPS_NAMES[2]] - 1):
+        battle.attack('A', [x, 2])
+        battle.attack('B', [x, GRID_SIZE - 1])
+
+    last_x = SHIPS_SIZES[SHIPS_NAMES[2]] - 1
+    assert battle.attack('A', [last_x, 2]) == {'attacked': SHIPS_NAMES[2], 'sunk': True, 'game_over': False}
+    assert battle.match.game_data['clients']['B']['sinked_ships'] == 1
+
+
+def test_attack_passes_turn(battle):
+    battle.attack('A', [0, 0])
+
+    assert not battle.match.game_data['clients']['A']['my_turn']
+    assert battle.match.game_data['clients']['B']['my_turn']
+
+
+def test_attack_out_of_battle_is_rejected(clients):
+    assert clients.attack('A', [0, 0]) == {'message': 'invalid_attack'}
+    assert clients.match.game_data['turn'] == 0
+
+
+def test_attack_out_of_turn_is_rejected(battle):
+    battle.request('B', {'request': 'subscribe'})
+    battle.events('B')
+
+    assert battle.attack('B', [0, 0]) == {'message': 'invalid_attack'}
+    assert battle.match.game_data['clients']['A']['my_turn']
+    assert battle.match.game_data['boards']['A'].shots == 0
+
+    # Client that gave its turn away is told it is still not its turn
+    assert battle.events('B') == [{'event': 'turn', 'my_turn': False}]
+
+
+@pytest.mark.parametrize('position', [[0.0, 0], ['0', 0], [0], None, 5])
+def test_attack_with_invalid_position_is_rejected(battle, position):
+    assert battle.attack('A', position) == {'message': 'invalid_attack'}
+    assert battle.match.game_data['clients']['A']['my_turn']
+
+
+def test_sinking_every_ship_wins_the_game(battle):
+    assert win_as_a(battle) == {'attacked': SHIPS_NAMES[-1], 'sunk': True, 'game_over': True}
+
+    assert battle.match.game_data['winner'] == 'A'
+    assert battle.match.game_data['game_status'] == 'finished'
+    assert battle.request('B', {'request': 'winner'}) == {'winner': 'A'}
+
+
+def test_attack_after_a_win_is_rejected(battle):
+    win_as_a(battle)
+
+    assert battle.attack('B', [0, 0]) == {'message': 'invalid_attack'}
+    assert battle.attack('A', [GRID_SIZE - 1, 0]) == {'message': 'invalid_attack'}
+
+
+def test_sync_bundles_turn_enemy_attack_status_and_winner(battle):
+    battle.attack('A', [0, 1])
+
+    assert battle.request('B', {'request': 'sync'}) == {
+        'my_turn': True,
+        'attacked_tile': {'position': [0, 1], 'ship_name': SHIPS_NAMES[1], 'sunk': False},
+        'game_status': 'battle',
+        'winner': None
+    }
+    assert battle.request('A', {'request': 'sync'})['attacked_tile']['position'] is None
+
+
+def test_subscribers_get_status_turn_attack_and_winner_events(clients):
+    clients.request('B', {'request': 'subscribe'})
+    assert clients.events('B') == [
+        {'event': 'game_status', 'game_status': 'ship_lock'},
+        {'event': 'turn', 'my_turn': False}
+    ]
+
+    clients.request('A', {'request': 'ship_locked', 'fleet': FLEET})
+    assert clients.events('B') == []
+
+    clients.request('B', {'request': 'ship_locked', 'fleet': FLEET})
+    assert clients.events('B') == [{'event': 'game_status', 'game_status': 'battle'}]
+
+    clients.attack('A', [0, 0])
+    assert clients.events('B') == [
+        {'event': 'attacked', 'attacker': 'A', 'position': [0, 0], 'ship_name': SHIPS_NAMES[0], 'sunk': False},
+        {'event': 'turn', 'my_turn': True}
+    ]
+
+    # A sinks every ship of B, A is not subscribed
+    clients.attack('B', [0, GRID_SIZE - 1])
+    win_as_a(clients)
+    assert clients.events('B')[-2:] == [
+        {'event': 'game_status', 'game_status': 'finished'},
+        {'event': 'winner', 'winner': 'A'}
+    ]
+    assert clients.events('A') == []
+
+
+def test_reset_game_starts_a_new_ship_lock(battle):
+    win_as_a(battle)
+    assert battle.request('A', {'request': 'reset_game'}) == {'message': 'ok'}
+
+    assert battle.match.game_data['game_status'] == 'ship_lock'
+    assert battle.match.game_data['winner'] is None
+    assert battle.match.game_data['boards'] == {'A': None, 'B': None}
+
+
+@pytest.mark.parametrize('player_name', ['event', 'request', 'game_status'])
+def test_game_data_is_wrapped_whatever_player_names_are(player_name):
+    clients = MatchClients()
+    clients.match.add_client(player_name)
+
+    response = clients.request(player_name, {'request': 'game_data'})
+    assert list(response) == ['clients']
+    assert response['clients'][player_name]['my_turn']
+
+
+def test_unknown_request_is_answered(clients):
+    assert clients.request('A', {'request': 'teleport'}) == {'message': 'unknown_request'}
+
+
+def test_disconnect_request_ends_the_connection(clients):
+    assert not clients.match.handle_request('A', {'request': 'disconnect'})
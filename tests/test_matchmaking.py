@@ -0,0 +1,73 @@
+from networking.matchmaking import Matchmaker
+
+
+def test_pairs_players_first_come_first_served():
+    matchmaker = Matchmaker()
+    for player, enqueued_at in (('c', 3.0), ('a', 1.0), ('d', 4.0), ('b', 2.0)):
+        matchmaker.enqueue(player, enqueued_at=enqueued_at)
+
+    assert matchmaker.pair_players() == [('a', 'b'), ('c', 'd')]
+    assert matchmaker.get_metrics()['queued_players'] == 0
+
+
+def test_odd_player_waits_for_an_opponent():
+    matchmaker = Matchmaker()
+    for player in ('a', 'b', 'c'):
+        matchmaker.enqueue(player)
+
+    assert matchmaker.pair_players() == [('a', 'b')]
+    assert matchmaker.pair_players() == []
+
+    matchmaker.enqueue('d')
+    assert matchmaker.pair_players() == [('c', 'd')]
+
+
+def test_removed_players_are_skipped():
+    matchmaker = Matchmaker()
+    for player in ('a', 'b', 'c'):
+        matchmaker.enqueue(player)
+    matchmaker.remove('a')
+    matchmaker.remove('unknown')
+
+    assert matchmaker.pair_players() == [('b', 'c')]
+
+
+def test_removed_player_can_queue_again():
+    matchmaker = Matchmaker()
+    matchmaker.enqueue('a', enqueued_at=1.0)
+    matchmaker.remove('a')
+    matchmaker.enqueue('b', enqueued_at=2.0)
+    matchmaker.enqueue('a', enqueued_at=3.0)
+
+    assert matchmaker.pair_players() == [('b', 'a')]
+
+
+def test_enqueue_ignores_queued_players():
+    matchmaker = Matchmaker()
+    matchmaker.enqueue('a')
+    matchmaker.enqueue('a')
+
+    assert matchmaker.pair_players() == []
+    assert matchmaker.get_metrics()['queued_players'] == 1
+
+
+def test_players_are_only_paired_inside_their_rating_band():
+    matchmaker = Matchmaker(band_width=200)
+    matchmaker.enqueue('low', rating=1010, enqueued_at=1.0)
+    matchmaker.enqueue('high', rating=1450, enqueued_at=2.0)
+    matchmaker.enqueue('unrated', enqueued_at=3.0)
+    matchmaker.enqueue('low2', rating=1190, enqueued_at=4.0)
+
+    assert matchmaker.pair_players() == [('low', 'low2')]
+    assert matchmaker.get_metrics()['queued_players'] == 2
+
+
+def test_metrics_count_paired_players():
+    matchmaker = Matchmaker()
+    matchmaker.enqueue('a')
+    matchmaker.enqueue('b')
+    matchmaker.pair_players()
+
+    metrics = matchmaker.get_metrics()
+    assert metrics['paired_players'] == 2
+    assert metrics['mean_wait_time'] >= 0.0
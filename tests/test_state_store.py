@@ -0,0 +1,80 @@
+import struct
+
+from networking.state_store import StateStore, WAL_RECORD
+
+
+def write_states(state_path, states, checkpoint_records=10000):
+    store = StateStore(str(state_path), commit_interval=0.001, checkpoint_records=checkpoint_records)
+    store.recover()
+    for match_id, state in states:
+        store.save(match_id, state)
+    store.close()
+
+
+def recover_states(state_path):
+    store = StateStore(str(state_path), commit_interval=0.001)
+    try:
+        return store.recover()
+    finally:
+        store.close()
+
+
+def test_recover_replays_saved_states(tmp_path):
+    state_path = tmp_path / 'state'
+    write_states(state_path, [(1, {'turn': 1}), (2, {'turn': 1}), (1, {'turn': 2})])
+
+    assert recover_states(state_path) == {1: {'turn': 2}, 2: {'turn': 1}}
+
+
+def test_recover_forgets_ended_matches(tmp_path):
+    state_path = tmp_path / 'state'
+    write_states(state_path, [(1, {'turn': 1}), (2, {'turn': 1}), (1, None)])
+
+    assert recover_states(state_path) == {2: {'turn': 1}}
+
+
+def test_recover_survives_several_restarts(tmp_path):
+    state_path = tmp_path / 'state'
+    write_states(state_path, [(1, {'turn': 1})])
+    write_states(state_path, [(2, {'turn': 5})])
+
+    assert recover_states(state_path) == {1: {'turn': 1}, 2: {'turn': 5}}
+
+
+def test_recover_reads_checkpoint_and_wal(tmp_path):
+    state_path = tmp_path / 'state'
+    write_states(
+        state_path,
+        [(match_id, {'turn': match_id}) for match_id in range(1, 8)],
+        checkpoint_records=3)
+
+    assert recover_states(state_path) == {
+        match_id: {'turn': match_id} for match_id in range(1, 8)}
+
+
+def test_recover_ignores_torn_last_record(tmp_path):
+    state_path = tmp_path / 'state'
+    write_states(state_path, [(1, {'turn': 1}), (2, {'turn': 1})])
+
+    wal_path = tmp_path / 'state.wal'
+    wal_data = wal_path.read_bytes()
+    wal_path.write_bytes(wal_data[:-3])
+
+    assert recover_states(state_path) == {1: {'turn': 1}}
+
+
+def test_recover_stops_at_corrupted_record(tmp_path):
+    state_path = tmp_path / 'state'
+    write_states(state_path, [(1, {'turn': 1}), (2, {'turn': 1}), (3, {'turn': 1})])
+
+    wal_path = tmp_path / 'state.wal'
+    wal_data = bytearray(wal_path.read_bytes())
+    first_size = WAL_RECORD.size + struct.unpack_from('!I', wal_data)[0]
+    wal_data[first_size + WAL_RECORD.size] ^= 0xFF
+    wal_path.write_bytes(bytes(wal_data))
+
+    assert recover_states(state_path) == {1: {'turn': 1}}
+
+
+def test_recover_without_files_is_empty(tmp_path):
+    assert recover_states(tmp_path / 'state') == {}